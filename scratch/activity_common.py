@@ -0,0 +1,222 @@
+"""
+Pieces shared by github-activity.py and gitlab-activity.py: the run
+journal behind --resume and the request metrics behind --metrics.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RunJournal:
+    """
+    Append-only log of a report run, so that an interrupted run can resume.
+
+    Each line is a JSON record: the run's options first, then finished
+    report units with their result and wall time, plus whatever records
+    a subclass adds (see _replay_record()). A resumed run reads the log
+    back and doesn't run the units it finished. run holds the options
+    that decide what is reported; a run with different ones, or one that
+    isn't resuming, starts a fresh log.
+    """
+
+    FILE_NAME = 'journal.jsonl'
+
+    def __init__(self, cache_dir, run: Dict, resume: bool = False):
+        self.path = Path(cache_dir) / self.FILE_NAME
+        self._results: Dict[str, Dict] = {}
+        # (unit or subclass key, seconds) of everything finished
+        self.timings: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+        resumed = resume and self._replay(run)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a' if resumed else 'w', encoding='utf-8')
+        if not resumed:
+            self._write({'run': run})
+
+    def _replay(self, run: Dict) -> bool:
+        """Load the log of the previous run if it ran with the same options."""
+        if not self.path.exists():
+            return False
+        with open(self.path, encoding='utf-8') as f:
+            records = []
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # The last line may be cut short by a crash
+                    break
+        if not records or records[0].get('run') != run:
+            logger.warning("Journal %s is from a different run, starting over", self.path)
+            return False
+
+        for record in records[1:]:
+            if 'unit' in record:
+                if record['result']['status'] == 'success':
+                    self._results[record['unit']] = record['result']
+                self.timings.append((record['unit'], record['seconds']))
+            else:
+                self._replay_record(record)
+        logger.debug("Resuming run: %d units finished", len(self._results))
+        return True
+
+    def _replay_record(self, record: Dict):
+        """Load a record other than a unit; subclasses journal more."""
+
+    def _write(self, record: Dict):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def result(self, unit: str) -> Optional[Dict]:
+        """Return the result of a unit the resumed run already finished."""
+        return self._results.get(unit)
+
+    def record_unit(self, unit: str, result: Dict, seconds: float):
+        self.timings.append((unit, seconds))
+        self._write({'unit': unit, 'seconds': round(seconds, 3), 'result': result})
+
+    def log_slowest(self, count: int = 10):
+        """Log the units (and subclass keys) that took the longest."""
+        for key, seconds in sorted(self.timings, key=lambda t: -t[1])[:count]:
+            logger.debug("%8.1fs %s", seconds, key)
+
+    def close(self):
+        self._file.close()
+
+
+class RequestMetrics:
+    """
+    Instrumentation of one run: request counts, latencies and bytes per
+    endpoint, seconds slept (by reason) and cache lookups (by outcome).
+    Reported at exit as a summary, as JSON or as a Prometheus textfile
+    whose metric names start with prefix.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.started = time.perf_counter()
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[Tuple[str, str], int] = {}
+        self.bytes: Dict[str, int] = {}
+        self.sleeps: Dict[str, float] = {}
+        self.cache: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, endpoint: str, seconds: float, status, size: int = 0):
+        """Record a request; status is the HTTP status or 'error' if none came back."""
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            key = (endpoint, str(status))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            self.bytes[endpoint] = self.bytes.get(endpoint, 0) + size
+
+    def record_sleep(self, reason: str, seconds: float):
+        with self._lock:
+            self.sleeps[reason] = self.sleeps.get(reason, 0.0) + seconds
+
+    def record_cache(self, outcome: str, count: int = 1):
+        with self._lock:
+            self.cache[outcome] = self.cache.get(outcome, 0) + count
+
+    @staticmethod
+    def _quantile(values: List[float], q: float) -> float:
+        """Nearest-rank quantile of sorted values."""
+        return values[min(len(values) - 1, max(0, int(round(q * len(values))) - 1))]
+
+    def snapshot(self) -> Dict:
+        """Return the metrics as a JSON-serialisable dictionary."""
+        with self._lock:
+            endpoints = {}
+            for endpoint, latencies in sorted(self.latencies.items()):
+                values = sorted(latencies)
+                endpoints[endpoint] = {
+                    'requests': len(values),
+                    'statuses': {status: count for (name, status), count
+                                 in sorted(self.statuses.items()) if name == endpoint},
+                    'bytes': self.bytes[endpoint],
+                    'seconds': sum(values),
+                    **{f"p{int(q * 100)}": self._quantile(values, q) for q in self.QUANTILES},
+                    'max': values[-1]
+                }
+            hits = self.cache.get('hits', 0)
+            lookups = sum(self.cache.values())
+            return {
+                'wall_seconds': time.perf_counter() - self.started,
+                'endpoints': endpoints,
+                'sleep_seconds': dict(self.sleeps),
+                'cache': {**self.cache,
+                          'hit_ratio': hits / lookups if lookups else None}
+            }
+
+    def print_summary(self, file=sys.stderr):
+        """Print a human-readable summary of the metrics."""
+        metrics = self.snapshot()
+        print(f"\nRequest metrics ({metrics['wall_seconds']:.1f}s wall time)", file=file)
+        print(f"{'Endpoint':<28} {'Reqs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'KiB':>9}", file=file)
+        for endpoint, stats in metrics['endpoints'].items():
+            print(f"{endpoint:<28} {stats['requests']:>6} {stats['p50']*1000:>8.0f} "
+                  f"{stats['p95']*1000:>8.0f} {stats['p99']*1000:>8.0f} "
+                  f"{stats['bytes']/1024:>9.1f}", file=file)
+        for reason, seconds in sorted(metrics['sleep_seconds'].items()):
+            print(f"Slept on {reason}: {seconds:.1f}s (summed over workers)", file=file)
+        cache = metrics['cache']
+        if cache['hit_ratio'] is not None:
+            lookups = sum(v for k, v in cache.items() if k != 'hit_ratio')
+            print(f"Cache: {cache.get('hits', 0)}/{lookups} hits "
+                  f"({cache['hit_ratio']*100:.1f}%)", file=file)
+
+    def prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        metrics = self.snapshot()
+        prefix = self.prefix
+        lines = [f"# TYPE {prefix}_requests_total counter"]
+        for endpoint, stats in metrics['endpoints'].items():
+            for status, count in stats['statuses'].items():
+                lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",'
+                             f'status="{status}"}} {count}')
+        lines.append(f"# TYPE {prefix}_request_duration_seconds summary")
+        for endpoint, stats in metrics['endpoints'].items():
+            for q in self.QUANTILES:
+                lines.append(f'{prefix}_request_duration_seconds{{endpoint="{endpoint}",'
+                             f'quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{endpoint}"}} '
+                         f'{stats["seconds"]:.6f}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{endpoint}"}} '
+                         f'{stats["requests"]}')
+        lines.append(f"# TYPE {prefix}_response_bytes_total counter")
+        for endpoint, stats in metrics['endpoints'].items():
+            lines.append(f'{prefix}_response_bytes_total{{endpoint="{endpoint}"}} '
+                         f'{stats["bytes"]}')
+        lines.append(f"# TYPE {prefix}_sleep_seconds_total counter")
+        for reason, seconds in sorted(metrics['sleep_seconds'].items()):
+            lines.append(f'{prefix}_sleep_seconds_total{{reason="{reason}"}} {seconds:.6f}')
+        lines.append(f"# TYPE {prefix}_cache_lookups_total counter")
+        for outcome, count in sorted(metrics['cache'].items()):
+            if outcome != 'hit_ratio':
+                lines.append(f'{prefix}_cache_lookups_total{{outcome="{outcome}"}} {count}')
+        lines.append(f"# TYPE {prefix}_wall_seconds gauge")
+        lines.append(f"{prefix}_wall_seconds {metrics['wall_seconds']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the metrics to path: JSON for .json, otherwise a Prometheus textfile."""
+        # Write then rename, so a textfile collector never reads a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if Path(path).suffix == '.json':
+                json.dump(self.snapshot(), f, indent=2)
+            else:
+                f.write(self.prometheus())
+        os.replace(tmp_path, path)
@@ -1,12 +1,22 @@
 #!/usr/bin/python3
 
 import argparse
+import hashlib
 import json
 import logging
+import os
+import re
 import requests
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Optional
+from requests.adapters import HTTPAdapter
+from typing import Callable, Optional, Union
+
+# Shared with gitlab-activity.py, next to this script
+import activity_common
+from activity_common import RequestMetrics
 
 # Default cache directory
 CACHE_DIR = Path(__file__).parent / ".gh-issues-cache"
@@ -83,318 +93,751 @@ def clear_cache() -> int:
     return count
 
 
-def get_user_issues_count(username: str, year: int = 2025, token: Optional[str] = None) -> dict:
+class RunJournal(activity_common.RunJournal):
     """
-    Get the count of issues opened by a user in a specific year.
-
-    Args:
-        username: GitHub username
-        year: Year to search (default: 2025)
-        token: Optional GitHub Personal Access Token for authentication
-
-    Returns:
-        Dictionary with username and issue count
+    Run journal (see activity_common.RunJournal) that also records every
+    finished search with its total_count and wall time, so a resumed run
+    doesn't send it again, even with --refresh or --no-cache.
     """
-    url = "https://api.github.com/search/issues"
-    params = {
-        'q': f'author:{username} type:issue created:{year}-01-01..{year}-12-31'
-    }
 
-    headers = {}
-    if token:
-        headers['Authorization'] = f'token {token}'
+    def __init__(self, cache_dir: Path, run: dict, resume: bool = False):
+        self._counts: dict[str, int] = {}
+        super().__init__(cache_dir, run, resume)
 
-    try:
-        logger.debug("GET %s?q=%s", url, params['q'])
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        logger.debug("Response: %s", response.status_code)
+    def _replay_record(self, record: dict):
+        if 'query' in record:
+            self._counts[record['query']] = record['total_count']
+            self.timings.append((record['q'], record['seconds']))
 
-        data = response.json()
-        return {
-            'username': username,
-            'issue_count': data['total_count'],
-            'status': 'success'
-        }
-    except requests.exceptions.RequestException as e:
-        return {
-            'username': username,
-            'issue_count': 0,
-            'status': 'error',
-            'error': str(e)
-        }
+    def total_count(self, query_key: str) -> Optional[int]:
+        """Return the answer to a search the resumed run already sent."""
+        return self._counts.get(query_key)
 
+    def record_search(self, query_key: str, query: str, total_count: int, seconds: float):
+        self.timings.append((query, seconds))
+        self._write({'query': query_key, 'q': query, 'seconds': round(seconds, 3),
+                     'total_count': total_count})
 
-def get_user_prs_count(username: str, year: int = 2025, token: Optional[str] = None) -> dict:
-    """
-    Get the count of PRs opened and merged by a user in a specific year.
 
-    Args:
-        username: GitHub username
-        year: Year to search (default: 2025)
-        token: Optional GitHub Personal Access Token for authentication
+def journal_unit(fetch_func: Callable, username: str, year: int) -> str:
+    """Journal key of one report unit: a stats method for a user and year."""
+    return f"{fetch_func.__name__}/{username}/{year}"
 
-    Returns:
-        Dictionary with username, opened PR count, and merged PR count
-    """
-    headers = {}
-    if token:
-        headers['Authorization'] = f'token {token}'
-
-    try:
-        # Query for opened PRs
-        opened_url = "https://api.github.com/search/issues"
-        opened_params = {
-            'q': f'author:{username} type:pr created:{year}-01-01..{year}-12-31'
-        }
 
-        logger.debug("GET %s?q=%s", opened_url, opened_params['q'])
-        opened_response = requests.get(opened_url, params=opened_params, headers=headers)
-        opened_response.raise_for_status()
-        logger.debug("Response: %s", opened_response.status_code)
-        opened_count = opened_response.json()['total_count']
-
-        # Small delay between requests
-        time.sleep(5)
-
-        # Query for merged PRs
-        merged_url = "https://api.github.com/search/issues"
-        merged_params = {
-            'q': f'author:{username} type:pr is:merged merged:{year}-01-01..{year}-12-31'
-        }
-
-        logger.debug("GET %s?q=%s", merged_url, merged_params['q'])
-        merged_response = requests.get(merged_url, params=merged_params, headers=headers)
-        merged_response.raise_for_status()
-        logger.debug("Response: %s", merged_response.status_code)
-        merged_count = merged_response.json()['total_count']
-
-        return {
-            'username': username,
-            'opened': opened_count,
-            'merged': merged_count,
-            'status': 'success'
-        }
-    except requests.exceptions.RequestException as e:
-        return {
-            'username': username,
-            'opened': 0,
-            'merged': 0,
-            'status': 'error',
-            'error': str(e)
-        }
-
-
-def get_user_commits_count(username: str, year: int = 2025, token: Optional[str] = None) -> dict:
+class SearchBudget:
     """
-    Get the count of commits made by a user in a specific year.
-
-    Args:
-        username: GitHub username
-        year: Year to search (default: 2025)
-        token: Optional GitHub Personal Access Token for authentication
+    Paces Search API requests by the budget GitHub reports.
 
-    Returns:
-        Dictionary with username and commit count
+    Every response carries X-RateLimit-Remaining and X-RateLimit-Reset,
+    saying how many requests are left in the current window and when it
+    resets. Requests run concurrently while budget remains; once it is used
+    up, callers sleep until the reset. Until the first response arrives only
+    a single request is let through.
     """
-    url = "https://api.github.com/search/commits"
-    params = {
-        'q': f'author:{username} committer-date:{year}-01-01..{year}-12-31'
-    }
-
-    headers = {
-        'Accept': 'application/vnd.github.cloak-preview'  # Required for commit search
-    }
-    if token:
-        headers['Authorization'] = f'token {token}'
-
-    try:
-        logger.debug("GET %s?q=%s", url, params['q'])
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        logger.debug("Response: %s", response.status_code)
-
-        data = response.json()
-        return {
-            'username': username,
-            'commit_count': data['total_count'],
-            'status': 'success'
-        }
-    except requests.exceptions.RequestException as e:
-        return {
-            'username': username,
-            'commit_count': 0,
-            'status': 'error',
-            'error': str(e)
-        }
 
+    def __init__(self):
+        self.remaining = 1
+        self.limit: Optional[int] = None
+        self.reset = 0.0
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent, then take it from the budget.
+
+        Returns:
+            Seconds spent waiting for budget
+        """
+        start = time.perf_counter()
+        with self._cond:
+            while self.remaining <= 0:
+                wait = self.reset - time.time()
+                if wait > 0:
+                    logger.debug("Search budget exhausted, sleeping %.1fs", wait)
+                    self._cond.wait(wait)
+                elif self.limit is not None:
+                    # The window has reset
+                    self.remaining = self.limit
+                elif self.in_flight == 0:
+                    # The window has reset but its size was never reported,
+                    # and no response is due to report it: send a probe
+                    self.remaining = 1
+                else:
+                    # Waiting for a request in flight to report the budget
+                    self._cond.wait()
+            self.remaining -= 1
+            self.in_flight += 1
+        return time.perf_counter() - start
+
+    def release(self, headers):
+        """Re-sync the budget from a response's rate limit headers."""
+        remaining = headers.get('X-RateLimit-Remaining', '')
+        reset = headers.get('X-RateLimit-Reset', '')
+        limit = headers.get('X-RateLimit-Limit', '')
+        with self._cond:
+            self.in_flight -= 1
+            if remaining.isdigit() and reset.isdigit():
+                if limit.isdigit():
+                    self.limit = int(limit)
+                # Requests still in flight may not have been counted yet
+                estimate = int(remaining) - self.in_flight
+                if float(reset) > self.reset:
+                    self.reset = float(reset)
+                    self.remaining = estimate
+                else:
+                    self.remaining = min(self.remaining, estimate)
+            elif self.limit is None:
+                # No budget reported (e.g. a failed request), let another probe
+                self.remaining = max(self.remaining, 1)
+            self._cond.notify_all()
+
+
+# Retries for Search API requests rejected by the rate limit
+SEARCH_RETRIES = 3
+
+# Seconds a failed search is remembered before it is sent again
+NEGATIVE_CACHE_TTL = 300
+
+
+class GitHubAPI:
+    """
+    GitHub Search API client.
 
-def get_user_commits_detailed(username: str, year: int = 2025, token: Optional[str] = None) -> dict:
+    Holds one pooled keep-alive session carrying the auth header, paces
+    requests with a SearchBudget, and records how long each request took.
     """
-    Get detailed commit statistics including authored vs committed counts.
 
-    Args:
-        username: GitHub username
-        year: Year to search (default: 2025)
-        token: Optional GitHub Personal Access Token for authentication
+    API_URL = "https://api.github.com"
+
+    # Prefix of this client's result cache keys
+    cache_prefix = ""
+
+    # Commit search used to require this preview media type
+    COMMIT_SEARCH_HEADERS = {'Accept': 'application/vnd.github.cloak-preview'}
+
+    def __init__(self, token: Optional[str] = None, pool_size: int = 10,
+                 use_cache: bool = True, revalidate: bool = False,
+                 journal: Optional[RunJournal] = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+        if token:
+            self.session.headers['Authorization'] = f'token {token}'
+        self.budget = SearchBudget()
+        # Answer searches from the query cache
+        self.use_cache = use_cache
+        # Send conditional requests for searches answered before
+        self.revalidate = revalidate
+        self.journal = journal
+        self.metrics = RequestMetrics('github_activity')
+
+    def _get(self, endpoint: str, params: dict, headers: Optional[dict] = None) -> requests.Response:
+        """GET an API endpoint on the shared session, recording its timing."""
+        url = f"{self.API_URL}/{endpoint}"
+        logger.debug("GET %s?q=%s", url, params['q'])
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, headers=headers)
+        except requests.exceptions.RequestException:
+            self.metrics.record_request(endpoint, time.perf_counter() - start, 'error')
+            raise
+        elapsed = time.perf_counter() - start
+        logger.debug("Response: %s (%.0f ms)", response.status_code, elapsed * 1000)
+        self.metrics.record_request(endpoint, elapsed, response.status_code,
+                                    len(response.content))
+        return response
+
+    @staticmethod
+    def _query_cache_key(endpoint: str, query: str) -> str:
+        """
+        Cache key for the answer to one search.
+
+        The query is normalized first: search qualifiers are
+        case-insensitive and their order doesn't matter, so the same
+        search written differently shares one entry.
+        """
+        normalized = " ".join(sorted(query.lower().split()))
+        digest = hashlib.sha1(f"{endpoint}?q={normalized}".encode()).hexdigest()
+        return f"search_{digest}"
+
+    def _conditional_headers(self, validators: Optional[dict]) -> dict:
+        """If-None-Match / If-Modified-Since headers for a stored answer."""
+        if validators is None:
+            return {}
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def search(self, endpoint: str, query: str, headers: Optional[dict] = None) -> int:
+        """
+        Run a Search API query within the rate budget.
+
+        Every answer is cached per query, with its ETag and Last-Modified,
+        so fetch functions that share a query share one request, and a
+        function that fails part way keeps the queries that succeeded.
+        Failed requests are cached too, for NEGATIVE_CACHE_TTL seconds, so
+        they aren't retried straight away, unless the query already has an
+        answer: a failed revalidation leaves that answer in place. With revalidate set, a query
+        answered before is sent as a conditional request; GitHub answers
+        304 Not Modified, which doesn't count against the rate limit, if
+        nothing has changed.
+
+        Requests rejected by the (primary or secondary) rate limit are
+        retried once the budget allows.
+
+        Returns:
+            The query's total_count
+        """
+        cache_key = self._query_cache_key(endpoint, query)
+        if self.journal is not None and self.journal.total_count(cache_key) is not None:
+            return self.journal.total_count(cache_key)
+        cached = load_from_cache(cache_key) if self.use_cache or self.revalidate else None
+        if cached is not None and 'total_count' not in cached:
+            if self.use_cache and time.time() - cached['cached_at'] < NEGATIVE_CACHE_TTL:
+                logger.debug("Cached failure: %s", query)
+                self.metrics.record_cache('negative_hits')
+                raise requests.exceptions.HTTPError(f"{cached['error']} (cached)")
+            cached = None
+        elif cached is not None and self.use_cache:
+            logger.debug("Query cache hit: %s", query)
+            self.metrics.record_cache('hits')
+            return cached['total_count']
+        self.metrics.record_cache('misses' if cached is None else 'revalidations')
+        headers = {**(headers or {}), **self._conditional_headers(cached)}
+
+        start = time.perf_counter()
+        total_count = self._search_request(endpoint, query, headers, cache_key, cached)
+        if self.journal is not None:
+            self.journal.record_search(cache_key, query, total_count,
+                                       time.perf_counter() - start)
+        return total_count
+
+    def _search_request(self, endpoint: str, query: str, headers: dict, cache_key: str,
+                        cached: Optional[dict]) -> int:
+        """Send a search (conditionally, if cached is set) and cache the answer."""
+        for attempt in range(SEARCH_RETRIES + 1):
+            waited = self.budget.acquire()
+            if waited > 0.001:
+                self.metrics.record_sleep('rate_limit', waited)
+            response = None
+            try:
+                response = self._get(endpoint, {'q': query}, headers)
+            finally:
+                self.budget.release(response.headers if response is not None else {})
+
+            rate_limited = (response.status_code in (403, 429)
+                            and (response.headers.get('X-RateLimit-Remaining') == '0'
+                                 or 'Retry-After' in response.headers))
+            if rate_limited and attempt < SEARCH_RETRIES:
+                retry_after = response.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    logger.debug("Rate limited, retrying in %ss", retry_after)
+                    time.sleep(int(retry_after))
+                    self.metrics.record_sleep('retry_after', int(retry_after))
+                continue
 
-    Returns:
-        Dictionary with username, authored commits, and committed commits
+            if response.status_code == 304:
+                logger.debug("Not modified: %s", query)
+                return cached['total_count']
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                if cached is None:
+                    save_to_cache(cache_key, {
+                        'endpoint': endpoint,
+                        'q': query,
+                        'error': str(e),
+                        'cached_at': time.time()
+                    })
+                else:
+                    # A failed revalidation keeps the known answer and its
+                    # validators; the failure is only noted alongside them.
+                    save_to_cache(cache_key, {**cached, 'error': str(e),
+                                              'failed_at': time.time()})
+                raise
+            total_count = response.json()['total_count']
+            save_to_cache(cache_key, {
+                'endpoint': endpoint,
+                'q': query,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'total_count': total_count
+            })
+            return total_count
+
+    def search_counts(self, endpoint: str, queries: list[str],
+                      headers: Optional[dict] = None) -> list[int]:
+        """
+        Run Search API queries concurrently.
+
+        Returns:
+            The total_count of each query, in order
+        """
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            return list(executor.map(lambda q: self.search(endpoint, q, headers), queries))
+
+    def get_user_issues_count(self, username: str, year: int = 2025) -> dict:
+        """
+        Get the count of issues opened by a user in a specific year.
+
+        Args:
+            username: GitHub username
+            year: Year to search (default: 2025)
+
+        Returns:
+            Dictionary with username and issue count
+        """
+        try:
+            issue_count = self.search(
+                'search/issues', f'author:{username} type:issue created:{year}-01-01..{year}-12-31')
+            return {
+                'username': username,
+                'issue_count': issue_count,
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'issue_count': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_user_prs_count(self, username: str, year: int = 2025) -> dict:
+        """
+        Get the count of PRs opened and merged by a user in a specific year.
+
+        Args:
+            username: GitHub username
+            year: Year to search (default: 2025)
+
+        Returns:
+            Dictionary with username, opened PR count, and merged PR count
+        """
+        try:
+            # Query for opened and merged PRs
+            opened_count, merged_count = self.search_counts(
+                'search/issues',
+                [f'author:{username} type:pr created:{year}-01-01..{year}-12-31',
+                 f'author:{username} type:pr is:merged merged:{year}-01-01..{year}-12-31'])
+
+            return {
+                'username': username,
+                'opened': opened_count,
+                'merged': merged_count,
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'opened': 0,
+                'merged': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_user_commits_count(self, username: str, year: int = 2025) -> dict:
+        """
+        Get the count of commits made by a user in a specific year.
+
+        Args:
+            username: GitHub username
+            year: Year to search (default: 2025)
+
+        Returns:
+            Dictionary with username and commit count
+        """
+        try:
+            commit_count = self.search(
+                'search/commits',
+                f'author:{username} committer-date:{year}-01-01..{year}-12-31',
+                self.COMMIT_SEARCH_HEADERS)
+            return {
+                'username': username,
+                'commit_count': commit_count,
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'commit_count': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_user_commits_detailed(self, username: str, year: int = 2025) -> dict:
+        """
+        Get detailed commit statistics including authored vs committed counts.
+
+        Args:
+            username: GitHub username
+            year: Year to search (default: 2025)
+
+        Returns:
+            Dictionary with username, authored commits, and committed commits
+        """
+        try:
+            # Query for commits by author-date (when the commit was originally
+            # created) and by committer-date (when the commit was applied)
+            authored_count, committed_count = self.search_counts(
+                'search/commits',
+                [f'author:{username} author-date:{year}-01-01..{year}-12-31',
+                 f'committer:{username} committer-date:{year}-01-01..{year}-12-31'],
+                self.COMMIT_SEARCH_HEADERS)
+
+            return {
+                'username': username,
+                'authored': authored_count,
+                'committed': committed_count,
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'authored': 0,
+                'committed': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_user_comments_count(self, username: str, year: int = 2025) -> dict:
+        """
+        Get the count of issues/PRs where a user has commented in a specific year.
+
+        Note: This counts issues/PRs with at least one comment from the user,
+        not the total number of comments made.
+
+        Args:
+            username: GitHub username
+            year: Year to search (default: 2025)
+
+        Returns:
+            Dictionary with username and count of issues/PRs commented on
+        """
+        try:
+            # Issues and PRs commented on
+            issues_commented, prs_commented = self.search_counts(
+                'search/issues',
+                [f'commenter:{username} type:issue updated:{year}-01-01..{year}-12-31',
+                 f'commenter:{username} type:pr updated:{year}-01-01..{year}-12-31'])
+
+            return {
+                'username': username,
+                'issues_commented': issues_commented,
+                'prs_commented': prs_commented,
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'issues_commented': 0,
+                'prs_commented': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+
+class GraphQLError(requests.exceptions.RequestException):
+    """A GraphQL response that carried errors instead of (complete) data."""
+
+
+class GitHubGraphQLAPI(GitHubAPI):
     """
-    headers = {
-        'Accept': 'application/vnd.github.cloak-preview'
-    }
-    if token:
-        headers['Authorization'] = f'token {token}'
-
-    try:
-        # Query for commits by author-date (when the commit was originally created)
-        authored_url = "https://api.github.com/search/commits"
-        authored_params = {
-            'q': f'author:{username} author-date:{year}-01-01..{year}-12-31'
-        }
+    GitHubAPI variant that reads contribution totals from the GraphQL API.
 
-        logger.debug("GET %s?q=%s", authored_url, authored_params['q'])
-        authored_response = requests.get(authored_url, params=authored_params, headers=headers)
-        authored_response.raise_for_status()
-        logger.debug("Response: %s", authored_response.status_code)
-        authored_count = authored_response.json()['total_count']
+    Issue, opened PR and commit totals come from contributionsCollection,
+    and merged PRs from a GraphQL issue search, for batch_size users per
+    aliased query. Committer and comment counts still use the Search API.
 
-        # Small delay between requests
-        time.sleep(5)
+    contributionsCollection counts contributions, so the totals can differ
+    from the Search API's: commits only count on default branches, and
+    activity in private repositories the token can't see is left out.
+    """
 
-        # Query for commits by committer-date (when the commit was applied)
-        committed_url = "https://api.github.com/search/commits"
-        committed_params = {
-            'q': f'committer:{username} committer-date:{year}-01-01..{year}-12-31'
-        }
+    cache_prefix = "graphql_"
+
+    def __init__(self, token: str, pool_size: int = 10, use_cache: bool = True,
+                 revalidate: bool = False, journal: Optional[RunJournal] = None,
+                 batch_size: int = 10):
+        super().__init__(token, pool_size, use_cache, revalidate, journal)
+        self.batch_size = batch_size
+        self._batches: dict[str, list[str]] = {}
+        self._memo: dict[str, Union[dict, Exception]] = {}
+        self._memo_locks: dict[str, threading.Lock] = {}
+        self._memo_guard = threading.Lock()
+
+    def plan_batches(self, usernames: list[str]):
+        """Split the users to be reported on into GraphQL query batches."""
+        for i in range(0, len(usernames), self.batch_size):
+            batch = usernames[i:i + self.batch_size]
+            for username in batch:
+                self._batches[username] = batch
+
+    def _graphql(self, query: str, variables: dict) -> dict:
+        """Run a GraphQL query and return its data."""
+        url = f"{self.API_URL}/graphql"
+        logger.debug("POST %s (%d variables)", url, len(variables))
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url, json={'query': query, 'variables': variables})
+        except requests.exceptions.RequestException:
+            self.metrics.record_request('graphql', time.perf_counter() - start, 'error')
+            raise
+        elapsed = time.perf_counter() - start
+        logger.debug("Response: %s (%.0f ms)", response.status_code, elapsed * 1000)
+        self.metrics.record_request('graphql', elapsed, response.status_code,
+                                    len(response.content))
+        response.raise_for_status()
 
-        logger.debug("GET %s?q=%s", committed_url, committed_params['q'])
-        committed_response = requests.get(committed_url, params=committed_params, headers=headers)
-        committed_response.raise_for_status()
-        logger.debug("Response: %s", committed_response.status_code)
-        committed_count = committed_response.json()['total_count']
-
-        return {
-            'username': username,
-            'authored': authored_count,
-            'committed': committed_count,
-            'status': 'success'
-        }
-    except requests.exceptions.RequestException as e:
-        return {
-            'username': username,
-            'authored': 0,
-            'committed': 0,
-            'status': 'error',
-            'error': str(e)
+        body = response.json()
+        # An unknown login only nulls out its own alias (with a NOT_FOUND
+        # error); that is reported per user, the rest of the batch is fine.
+        errors = [error for error in body.get('errors') or []
+                  if not self._is_missing_alias(error)]
+        if errors or body.get('data') is None:
+            raise GraphQLError("; ".join(error.get('message', str(error))
+                                         for error in errors or body.get('errors', [])))
+        return body['data']
+
+    @staticmethod
+    def _is_missing_alias(error: dict) -> bool:
+        """Whether error is a NOT_FOUND for one of a batch's uN/mN aliases."""
+        path = error.get('path') or []
+        return (error.get('type') == 'NOT_FOUND' and len(path) == 1
+                and re.fullmatch(r'[um]\d+', str(path[0])) is not None)
+
+    @staticmethod
+    def _contributions_query(usernames: list[str], year: int) -> tuple[str, dict]:
+        """Build an aliased contributions query for usernames."""
+        variables = {
+            'from': f"{year}-01-01T00:00:00Z",
+            'to': f"{year}-12-31T23:59:59Z"
         }
-
-
-def get_user_comments_count(username: str, year: int = 2025, token: Optional[str] = None) -> dict:
+        declarations = ["$from: DateTime!", "$to: DateTime!"]
+        fields = []
+        for i, username in enumerate(usernames):
+            variables[f"u{i}"] = username
+            variables[f"m{i}"] = (f'author:{username} type:pr is:merged '
+                                  f'merged:{year}-01-01..{year}-12-31')
+            declarations += [f"$u{i}: String!", f"$m{i}: String!"]
+            fields.append(
+                f"u{i}: user(login: $u{i}) {{ contributionsCollection(from: $from, to: $to) {{"
+                " totalIssueContributions totalPullRequestContributions"
+                " totalCommitContributions } }"
+                f" m{i}: search(query: $m{i}, type: ISSUE, first: 0) {{ issueCount }}")
+        return f"query({', '.join(declarations)}) {{ {' '.join(fields)} }}", variables
+
+    def _fetch_contributions(self, usernames: list[str], year: int) -> dict[str, Optional[dict]]:
+        """
+        Get contribution totals for a batch of users with one query.
+
+        Returns:
+            Dictionary mapping username to its totals, or to None for
+            unknown users
+        """
+        data = self._graphql(*self._contributions_query(usernames, year))
+        results = {}
+        for i, username in enumerate(usernames):
+            user = data.get(f"u{i}")
+            if user is None or data.get(f"m{i}") is None:
+                results[username] = None
+                continue
+            contributions = user['contributionsCollection']
+            results[username] = {
+                'issues': contributions['totalIssueContributions'],
+                'opened': contributions['totalPullRequestContributions'],
+                'commits': contributions['totalCommitContributions'],
+                'merged': data[f"m{i}"]['issueCount']
+            }
+        return results
+
+    def _contributions(self, username: str, year: int) -> dict:
+        """
+        Get a user's contribution totals, fetching their whole batch the
+        first time any of its users is asked for.
+        """
+        batch = self._batches.get(username, [username])
+        key = f"{year}_{'_'.join(batch)}"
+        with self._memo_guard:
+            lock = self._memo_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._memo:
+                try:
+                    self._memo[key] = self._fetch_contributions(batch, year)
+                except requests.exceptions.RequestException as e:
+                    # every user of the batch would send the same query again
+                    self._memo[key] = e
+        if isinstance(self._memo[key], Exception):
+            raise self._memo[key]
+        contributions = self._memo[key][username]
+        if contributions is None:
+            raise GraphQLError(f"Could not resolve to a User with the login of '{username}'")
+        return contributions
+
+    def get_user_issues_count(self, username: str, year: int = 2025) -> dict:
+        """Get the count of issues opened by a user in a specific year."""
+        try:
+            return {
+                'username': username,
+                'issue_count': self._contributions(username, year)['issues'],
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'issue_count': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_user_prs_count(self, username: str, year: int = 2025) -> dict:
+        """Get the count of PRs opened and merged by a user in a specific year."""
+        try:
+            contributions = self._contributions(username, year)
+            return {
+                'username': username,
+                'opened': contributions['opened'],
+                'merged': contributions['merged'],
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'opened': 0,
+                'merged': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_user_commits_count(self, username: str, year: int = 2025) -> dict:
+        """Get the count of commits made by a user in a specific year."""
+        try:
+            return {
+                'username': username,
+                'commit_count': self._contributions(username, year)['commits'],
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'commit_count': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    def get_user_commits_detailed(self, username: str, year: int = 2025) -> dict:
+        """
+        Get detailed commit statistics including authored vs committed counts.
+
+        Authored commits come from contributionsCollection; GraphQL has no
+        commit search, so committed commits still come from the Search API.
+        """
+        try:
+            authored_count = self._contributions(username, year)['commits']
+            committed_count = self.search(
+                'search/commits',
+                f'committer:{username} committer-date:{year}-01-01..{year}-12-31',
+                self.COMMIT_SEARCH_HEADERS)
+            return {
+                'username': username,
+                'authored': authored_count,
+                'committed': committed_count,
+                'status': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'username': username,
+                'authored': 0,
+                'committed': 0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+
+def stats_cache_key(fetch_func: Callable, username: str, year: int) -> str:
+    """Cache key for one user's result from a GitHubAPI method."""
+    return f"{fetch_func.__self__.cache_prefix}{fetch_func.__name__}_{username}_{year}"
+
+
+def run_unit(fetch_func: Callable, username: str, year: int,
+             journal: Optional[RunJournal] = None) -> dict:
+    """Call fetch_func for a user, recording the result and its wall time in journal."""
+    start = time.perf_counter()
+    result = fetch_func(username, year)
+    if journal is not None and result['status'] == 'success':
+        journal.record_unit(journal_unit(fetch_func, username, year), result,
+                            time.perf_counter() - start)
+    return result
+
+
+def submit_user_stats(executor: ThreadPoolExecutor, usernames: list[str], fetch_func: Callable,
+                      year: int, use_cache: bool = True,
+                      journal: Optional[RunJournal] = None) -> list[Union[dict, Future]]:
     """
-    Get the count of issues/PRs where a user has commented in a specific year.
-
-    Note: This counts issues/PRs with at least one comment from the user,
-    not the total number of comments made.
-
-    Args:
-        username: GitHub username
-        year: Year to search (default: 2025)
-        token: Optional GitHub Personal Access Token for authentication
+    Queue fetch_func for every user without a cached result, or one the
+    resumed run recorded in journal.
 
     Returns:
-        Dictionary with username and count of issues/PRs commented on
+        For each user, in order, the cached result or the future of the fetch
     """
-    headers = {}
-    if token:
-        headers['Authorization'] = f'token {token}'
+    pending = []
 
-    try:
-        url = "https://api.github.com/search/issues"
+    for username in usernames:
+        if journal is not None:
+            resumed_result = journal.result(journal_unit(fetch_func, username, year))
+            if resumed_result is not None:
+                pending.append(resumed_result)
+                continue
 
-        # Issues commented on
-        issue_params = {
-            'q': f'commenter:{username} type:issue updated:{year}-01-01..{year}-12-31'
-        }
-        logger.debug("GET %s?q=%s", url, issue_params['q'])
-        issue_response = requests.get(url, params=issue_params, headers=headers)
-        issue_response.raise_for_status()
-        logger.debug("Response: %s", issue_response.status_code)
-        issues_commented = issue_response.json()['total_count']
+        cache_key = stats_cache_key(fetch_func, username, year)
 
-        time.sleep(5)
+        # Try to load from cache first
+        if use_cache:
+            cached_result = load_from_cache(cache_key)
+            if cached_result is not None:
+                fetch_func.__self__.metrics.record_cache('hits')
+                pending.append(cached_result)
+                continue
 
-        # PRs commented on
-        pr_params = {
-            'q': f'commenter:{username} type:pr updated:{year}-01-01..{year}-12-31'
-        }
-        logger.debug("GET %s?q=%s", url, pr_params['q'])
-        pr_response = requests.get(url, params=pr_params, headers=headers)
-        pr_response.raise_for_status()
-        logger.debug("Response: %s", pr_response.status_code)
-        prs_commented = pr_response.json()['total_count']
-
-        return {
-            'username': username,
-            'issues_commented': issues_commented,
-            'prs_commented': prs_commented,
-            'status': 'success'
-        }
-    except requests.exceptions.RequestException as e:
-        return {
-            'username': username,
-            'issues_commented': 0,
-            'prs_commented': 0,
-            'status': 'error',
-            'error': str(e)
-        }
+        pending.append(executor.submit(run_unit, fetch_func, username, year, journal))
 
+    return pending
 
-def fetch_user_stats(usernames: list[str], fetch_func: Callable, year: int, token: Optional[str],
-                     format_success: Callable[[dict], str], use_cache: bool = True) -> list[dict]:
-    """
-    Fetch statistics for a list of users using the provided fetch function.
 
-    Args:
-        usernames: List of GitHub usernames
-        fetch_func: Function to call for each user (signature: func(username, year, token) -> dict)
-        year: Year to query
-        token: GitHub token for authentication
-        format_success: Function to format success message (signature: func(result) -> str)
-        use_cache: Whether to use cached results (default: True)
+def collect_user_stats(pending: list[Union[dict, Future]], fetch_func: Callable, year: int,
+                       format_success: Callable[[dict], str]) -> list[dict]:
+    """
+    Wait for queued per-user fetches, caching and printing them in order.
 
     Returns:
         List of result dictionaries
     """
     results = []
-    func_name = fetch_func.__name__
 
-    for username in usernames:
-        cache_key = f"{func_name}_{username}_{year}"
+    for entry in pending:
+        if not isinstance(entry, Future):
+            print(f"Loading {entry['username']}... [cached] ✓ {format_success(entry)}")
+            results.append(entry)
+            continue
 
-        # Try to load from cache first
-        if use_cache:
-            cached_result = load_from_cache(cache_key)
-            if cached_result is not None:
-                print(f"Loading {username}... [cached] ✓ {format_success(cached_result)}")
-                results.append(cached_result)
-                continue
-
-        # Fetch from API
-        print(f"Querying {username}...", end=' ')
-        result = fetch_func(username, year, token)
+        result = entry.result()
         results.append(result)
+        print(f"Querying {result['username']}...", end=' ')
 
         if result['status'] == 'success':
             print(f"✓ {format_success(result)}")
             # Save successful results to cache
-            save_to_cache(cache_key, result)
+            save_to_cache(stats_cache_key(fetch_func, result['username'], year), result)
         else:
             print(f"✗ Error: {result.get('error', 'Unknown error')}")
 
-        time.sleep(5)
-
     return results
 
 
@@ -499,16 +942,50 @@ def print_comments_summary(results: list[dict]):
     print(f"{'Total':<20} {total_issues:>12} {total_prs:>12} {total_issues + total_prs:>12}")
 
 
+# Report phases, in output order: (description, GitHubAPI method name,
+# success formatter, summary printer)
+REPORT_PHASES = [
+    ("issue counts",
+     'get_user_issues_count',
+     lambda r: f"{r['issue_count']} issues",
+     print_issue_summary),
+    ("PR statistics",
+     'get_user_prs_count',
+     lambda r: f"Opened: {r['opened']}, Merged: {r['merged']}",
+     print_pr_summary),
+    ("commit statistics",
+     'get_user_commits_detailed',
+     lambda r: f"Authored: {r['authored']}, Committed: {r['committed']}",
+     print_commits_detailed_summary),
+    ("comment statistics",
+     'get_user_comments_count',
+     lambda r: f"Issues: {r['issues_commented']}, PRs: {r['prs_commented']}",
+     print_comments_summary),
+]
+
+
 def parse_args() -> argparse.Namespace:
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
         description="Fetch GitHub issue and PR statistics for users"
     )
-    parser.add_argument(
+    freshness = parser.add_mutually_exclusive_group()
+    freshness.add_argument(
         "--no-cache",
         action="store_true",
         help="Bypass cache and fetch fresh data from API"
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted run, skipping the searches and users it finished"
+    )
+    freshness.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalidate cached data with conditional requests; unchanged "
+             "results cost no rate limit"
+    )
     parser.add_argument(
         "--clear-cache",
         action="store_true",
@@ -520,13 +997,58 @@ def parse_args() -> argparse.Namespace:
         default=2025,
         help="Year to query (default: 2025)"
     )
+    parser.add_argument(
+        "--token",
+        "-t",
+        default=os.environ.get("GITHUB_TOKEN"),
+        help="GitHub Personal Access Token (or set GITHUB_TOKEN env var)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["rest", "graphql"],
+        default="rest",
+        help="API for issue, PR and commit totals: the Search API or GraphQL "
+             "contributionsCollection (default: rest)"
+    )
+    parser.add_argument(
+        "--graphql-batch",
+        type=int,
+        default=10,
+        help="Users per GraphQL query with --backend graphql (default: 10)"
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=4,
+        help="Number of users to fetch concurrently (default: 4)"
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Print request counts, latencies, bytes, rate limit sleeps and cache "
+             "hits to stderr at exit (implied by --verbose)"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="FILE",
+        help="Write the request metrics to FILE: JSON if it ends in .json, "
+             "otherwise a Prometheus textfile"
+    )
     parser.add_argument(
         "--verbose",
         "-v",
         action="store_true",
         help="Show detailed output including API calls"
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.graphql_batch < 1:
+        parser.error("--graphql-batch must be at least 1")
+    if args.backend == "graphql" and not args.token:
+        parser.error("--backend graphql requires a token (--token or GITHUB_TOKEN)")
+    return args
 
 
 def main():
@@ -542,15 +1064,19 @@ def main():
         return
 
     # Configuration
-    GITHUB_TOKEN = None
+    GITHUB_TOKEN = args.token
     YEAR = args.year
-    use_cache = not args.no_cache
+    use_cache = not (args.no_cache or args.refresh)
 
     logger.debug("Year: %s", YEAR)
+    logger.debug("Jobs: %d", args.jobs)
+    logger.debug("Backend: %s", args.backend)
     logger.debug("Cache enabled: %s", use_cache)
     logger.debug("Cache directory: %s", CACHE_DIR)
 
-    if not use_cache:
+    if args.refresh:
+        print("[Revalidating cached data]\n")
+    elif not use_cache:
         print("[Cache disabled - fetching fresh data]\n")
 
     usernames = [
@@ -566,53 +1092,41 @@ def main():
         "yih-redhat",
     ]
 
-    # Fetch and display issue statistics
-    print(f"Fetching issue counts for {YEAR}...\n")
-    issue_results = fetch_user_stats(
-        usernames,
-        get_user_issues_count,
-        YEAR,
-        GITHUB_TOKEN,
-        lambda r: f"{r['issue_count']} issues",
-        use_cache=use_cache
-    )
-    print_issue_summary(issue_results)
-
-    # Fetch and display PR statistics
-    print(f"\nFetching PR statistics for {YEAR}...\n")
-    pr_results = fetch_user_stats(
-        usernames,
-        get_user_prs_count,
-        YEAR,
-        GITHUB_TOKEN,
-        lambda r: f"Opened: {r['opened']}, Merged: {r['merged']}",
-        use_cache=use_cache
-    )
-    print_pr_summary(pr_results)
-
-    # Fetch and display commit statistics
-    print(f"\nFetching commit statistics for {YEAR}...\n")
-    commit_results = fetch_user_stats(
-        usernames,
-        get_user_commits_detailed,
-        YEAR,
-        GITHUB_TOKEN,
-        lambda r: f"Authored: {r['authored']}, Committed: {r['committed']}",
-        use_cache=use_cache
-    )
-    print_commits_detailed_summary(commit_results)
-
-    # Fetch and display comment statistics
-    print(f"\nFetching comment statistics for {YEAR}...\n")
-    comment_results = fetch_user_stats(
-        usernames,
-        get_user_comments_count,
-        YEAR,
-        GITHUB_TOKEN,
-        lambda r: f"Issues: {r['issues_commented']}, PRs: {r['prs_commented']}",
-        use_cache=use_cache
-    )
-    print_comments_summary(comment_results)
+    journal = RunJournal(CACHE_DIR, {
+        'usernames': usernames,
+        'year': YEAR,
+        'backend': args.backend
+    }, resume=args.resume)
+    # Each user's fetch may run two queries at once
+    if args.backend == "graphql":
+        api = GitHubGraphQLAPI(GITHUB_TOKEN, pool_size=2 * args.jobs,
+                               use_cache=use_cache, revalidate=args.refresh,
+                               journal=journal, batch_size=args.graphql_batch)
+        api.plan_batches(usernames)
+    else:
+        api = GitHubAPI(GITHUB_TOKEN, pool_size=2 * args.jobs, use_cache=use_cache,
+                        revalidate=args.refresh, journal=journal)
+    # Every phase is queued on one worker pool up front so that later phases
+    # start fetching while earlier ones are still running; the results are
+    # then printed phase by phase, in username order.
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        pending = [submit_user_stats(executor, usernames, getattr(api, method), YEAR,
+                                     use_cache=use_cache, journal=journal)
+                   for _, method, _, _ in REPORT_PHASES]
+
+        for index, ((description, method, format_success, print_summary), entries) in \
+                enumerate(zip(REPORT_PHASES, pending)):
+            prefix = "\n" if index else ""
+            print(f"{prefix}Fetching {description} for {YEAR}...\n")
+            print_summary(collect_user_stats(entries, getattr(api, method), YEAR,
+                                             format_success))
+
+    journal.log_slowest()
+    journal.close()
+    if args.metrics or args.verbose:
+        api.metrics.print_summary()
+    if args.metrics_file:
+        api.metrics.write(args.metrics_file)
 
 
 if __name__ == "__main__":
@@ -7,13 +7,25 @@ Supports caching, verbose output, and PAT authentication.
 """
 
 import argparse
+import asyncio
+import csv
 import json
 import logging
 import os
+import random
+import re
+import sqlite3
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
-from urllib.parse import urljoin
+from itertools import chain, islice
+from typing import (AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple,
+                    Optional, Tuple)
+from urllib.parse import urljoin, urlparse
 
 try:
     import requests
@@ -21,6 +33,23 @@ except ImportError:
     print("Error: requests library required. Install with: pip install requests")
     sys.exit(1)
 
+# aiohttp is only needed for --async
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# pyarrow is only needed for Parquet output
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Shared with github-activity.py, next to this script
+import activity_common
+from activity_common import RequestMetrics
+
 # Set up logger
 logger = logging.getLogger(__name__)
 
@@ -41,6 +70,9 @@ DEFAULT_USERNAMES = [
     "yih1",
 ]
 
+# Year reported on when no --year or --since/--until is given
+DEFAULT_YEAR = 2025
+
 
 def setup_logging(verbose: bool) -> None:
     """Configure logging based on verbosity level."""
@@ -51,236 +83,1286 @@ def setup_logging(verbose: bool) -> None:
     )
 
 
-class GitLabAPI:
-    """Simple GitLab API client with caching."""
+USER_NOT_FOUND = 'User not found'
 
-    def __init__(self, base_url: str, token: str, cache_dir: str = ".cache",
-                 use_cache: bool = True):
-        self.base_url = base_url.rstrip('/')
-        self.token = token
+
+def error_result(username: str, fetch_func: Callable, error: str) -> Dict:
+    """Build an error result with the fields expected for fetch_func."""
+    func_name = fetch_func.__name__
+    if 'issue_stats' in func_name:
+        fields = {'issue_count': 0}
+    elif 'commit' in func_name:
+        fields = {'commit_count': 0}
+    elif 'comment' in func_name:
+        fields = {'issues_commented': 0, 'mrs_commented': 0}
+    else:
+        fields = {'opened': 0, 'merged': 0}
+
+    return {
+        'username': username,
+        **fields,
+        'status': 'error',
+        'error': error
+    }
+
+
+# action_name values that differ from the Events API action filter name
+EVENT_ACTION_ALIASES = {
+    'pushed to': 'pushed',
+    'pushed new': 'pushed',
+    'commented on': 'commented',
+    'accepted': 'merged',
+    'deleted': 'destroyed',
+}
+
+
+def event_action(event: Dict) -> str:
+    """Map an event to the action filter name that would have matched it."""
+    # Branch deletions are push events too, but have action_name 'deleted'
+    if 'push_data' in event:
+        return 'pushed'
+    action_name = event.get('action_name', '')
+    return EVENT_ACTION_ALIASES.get(action_name, action_name)
+
+
+def bucket_events_by_action(events: List[Dict]) -> Dict[str, List[Dict]]:
+    """Group events by action, as if fetched separately with ?action=..."""
+    buckets: Dict[str, List[Dict]] = {}
+    for event in events:
+        buckets.setdefault(event_action(event), []).append(event)
+    return buckets
+
+
+# HTTP statuses worth retrying: rate limited, or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int, headers=None, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    Return how long to wait before retry number attempt (0-based).
+
+    Honours Retry-After, then RateLimit-Reset, and otherwise uses jittered
+    exponential backoff.
+    """
+    headers = headers or {}
+    retry_after = headers.get('Retry-After', '')
+    if retry_after.isdigit():
+        return float(retry_after)
+    reset = headers.get('RateLimit-Reset', '')
+    if reset.isdigit() and headers.get('RateLimit-Remaining') == '0':
+        return max(float(reset) - time.time(), 0.0)
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class RateLimiter:
+    """
+    Token bucket pacing requests to GitLab's advertised rate limit.
+
+    Requests are not paced until a response has reported RateLimit-Remaining
+    and RateLimit-Reset; from then on the refill rate spreads the remaining
+    requests evenly over the time left until the limit resets.
+    """
+
+    def __init__(self, burst: int = 10):
+        self.burst = burst
+        self.rate: Optional[float] = None
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before using it."""
+        with self._lock:
+            if self.rate is None:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def update(self, headers):
+        """Re-pace from a response's RateLimit-Remaining/RateLimit-Reset headers."""
+        remaining = headers.get('RateLimit-Remaining', '')
+        reset = headers.get('RateLimit-Reset', '')
+        if not (remaining.isdigit() and reset.isdigit()):
+            return
+        window = max(float(reset) - time.time(), 1.0)
+        with self._lock:
+            self.rate = max(int(remaining), 1) / window
+            self.tokens = min(self.tokens, float(remaining))
+
+
+def endpoint_name(url: str) -> str:
+    """Name a request for RequestMetrics by its API path, with IDs replaced by :id."""
+    path = urlparse(url).path.split('/api/v4/', 1)[-1]
+    return re.sub(r'(?<=/)\d+(?=/|$)', ':id', path)
+
+
+# Seconds a cache entry stays fresh, by key family, as (current year, past
+# years); None means it never expires. Activity in the current year keeps
+# changing, while past years only see the odd late state change.
+CACHE_TTLS = {
+    'user': (None, None),
+    'issues': (6 * 3600, 30 * 86400),
+    'mrs': (6 * 3600, 30 * 86400),
+    'events': (3600, None),
+    'counts': (6 * 3600, 30 * 86400),
+}
+
+# Default upper bound on the size of the cache database
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# SQL expression bucketing cached objects by YYYY-MM of creation
+MONTH_SQL = "substr(created_at, 1, 7)"
+
+
+class CollectionQuery(NamedTuple):
+    """A cacheable, paginated API query and the slice of objects it covers."""
+    cache_key: str
+    endpoint: str
+    params: Dict
+    resource: str
+    scope: Dict
+    description: str
+    # Parameter used to ask for objects changed since the high-water mark
+    delta_key: str = 'updated_after'
+
+
+class DateRange(NamedTuple):
+    """An inclusive range of dates to report on."""
+    since: date
+    until: date
+
+    @classmethod
+    def for_year(cls, year: int) -> 'DateRange':
+        return cls(date(year, 1, 1), date(year, 12, 31))
+
+    def is_year(self) -> bool:
+        """Whether the range is exactly one calendar year."""
+        return self == self.for_year(self.since.year)
+
+    @property
+    def label(self) -> str:
+        """Human-readable form: the year, or since..until."""
+        if self.is_year():
+            return str(self.since.year)
+        return f"{self.since} to {self.until}"
+
+    @property
+    def key(self) -> str:
+        """Cache key suffix: the year, or since_until as YYYYMMDD."""
+        if self.is_year():
+            return str(self.since.year)
+        return f"{self.since:%Y%m%d}_{self.until:%Y%m%d}"
+
+    def years(self) -> range:
+        return range(self.since.year, self.until.year + 1)
+
+    def months(self) -> List[str]:
+        """The YYYY-MM months the range touches, in order."""
+        return [f"{year}-{month:02d}" for year in self.years() for month in range(1, 13)
+                if date(year, month, 1) <= self.until
+                and (year, month) >= (self.since.year, self.since.month)]
+
+    def bounds(self) -> Tuple[str, str]:
+        """Half-open created_at bounds for slicing cached objects."""
+        return self.since.isoformat(), (self.until + timedelta(days=1)).isoformat()
+
+
+class GitLabCache:
+    """
+    SQLite-backed cache of GitLab API objects.
+
+    Every object is stored once, as a row keyed by resource type and id,
+    with its author, year and state (the action, for events) broken out
+    into indexed columns so that stats can be computed as SQL aggregates.
+    Each cached query is recorded along with the slice of objects it
+    covers, its fetch time, size and last access; those drive TTL expiry
+    and LRU eviction. Queries that only return totals (resource 'counts')
+    keep their result in the query_values table instead.
+    """
+
+    DB_NAME = 'cache.sqlite3'
+    SCOPE_COLUMNS = ('author', 'author_id', 'year', 'state')
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS objects (
+            resource TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            author TEXT,
+            author_id INTEGER,
+            year INTEGER,
+            state TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (resource, id)
+        );
+        CREATE INDEX IF NOT EXISTS objects_by_author
+            ON objects (resource, author, year, state);
+        CREATE INDEX IF NOT EXISTS objects_by_author_id
+            ON objects (resource, author_id, year, state);
+        CREATE TABLE IF NOT EXISTS queries (
+            cache_key TEXT PRIMARY KEY,
+            resource TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS query_values (
+            cache_key TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, cache_dir: str = ".cache", use_cache: bool = True,
+                 ttls: Optional[Dict[str, Tuple]] = None,
+                 max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
         self.cache_dir = Path(cache_dir)
         self.use_cache = use_cache
-        self.session = requests.Session()
-        self.session.headers.update({
-            'PRIVATE-TOKEN': token,
-            'Content-Type': 'application/json'
-        })
+        self.ttls = {**CACHE_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.counters = {'hits': 0, 'misses': 0, 'stale': 0}
 
         # Create cache directory
         self.cache_dir.mkdir(exist_ok=True)
 
-    def _get_cache_path(self, cache_key: str) -> Path:
-        """Generate cache file path."""
-        safe_key = cache_key.replace('/', '_').replace('?', '_')
-        return self.cache_dir / f"{safe_key}.json"
+        # One connection shared by all worker threads, serialised by a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.cache_dir / self.DB_NAME,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
 
-    def _read_cache(self, cache_key: str) -> Optional[Dict]:
-        """Read from cache if exists and caching is enabled."""
+    def _scope_sql(self, scope: Dict,
+                   between: Optional[Tuple[str, str]] = None) -> Tuple[str, List]:
+        """
+        Build a WHERE fragment matching the objects in scope, optionally
+        restricted to those created in the half-open range between.
+        """
+        clauses, values = [], []
+        for column, value in scope.items():
+            if column not in self.SCOPE_COLUMNS:
+                raise ValueError(f"Unknown cache scope column: {column}")
+            clauses.append(f"{column} = ?")
+            values.append(value)
+        if between:
+            clauses.append("created_at >= ? AND created_at < ?")
+            values.extend(between)
+        return "".join(f" AND {clause}" for clause in clauses), values
+
+    @staticmethod
+    def _object_row(resource: str, item: Dict) -> Tuple:
+        """Break an API object out into an objects table row."""
+        author = item.get('author') or {}
+        if resource == 'users':
+            username, user_id = item.get('username'), item.get('id')
+        else:
+            username = item.get('author_username') or author.get('username')
+            user_id = item.get('author_id') or author.get('id')
+        created_at = item.get('created_at')
+        state = event_action(item) if resource == 'events' else item.get('state')
+        return (resource, item['id'], username, user_id,
+                int(created_at[:4]) if created_at else None, state,
+                created_at, item.get('updated_at'), json.dumps(item))
+
+    def ttl(self, cache_key: str) -> Optional[float]:
+        """Return the TTL in seconds for a key, or None if it never expires."""
+        family = cache_key.split('_', 1)[0]
+        current_ttl, past_ttl = self.ttls.get(family, (None, None))
+        # The (last) year is a _YYYY suffix, or a _YYYYMMDD range end
+        years = re.findall(r'_(\d{4})(?:\d{4})?(?=_|$)', cache_key)
+        if years and int(years[-1]) < date.today().year:
+            return past_ttl
+        return current_ttl
+
+    def _is_expired(self, cache_key: str, fetched_at: float) -> bool:
+        ttl = self.ttl(cache_key)
+        return ttl is not None and time.time() - fetched_at > ttl
+
+    def lookup(self, cache_key: str) -> Optional[Dict]:
+        """
+        Look up a cached query if caching is enabled.
+
+        Returns:
+            Dictionary with the query's fetched_at and whether it has
+            expired, or None on a miss
+        """
         if not self.use_cache:
             logger.debug("Cache BYPASSED: %s", cache_key)
             return None
-        cache_path = self._get_cache_path(cache_key)
-        if cache_path.exists():
-            logger.debug("Cache HIT: %s", cache_key)
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        logger.debug("Cache MISS: %s", cache_key)
-        return None
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT fetched_at FROM queries WHERE cache_key = ?",
+                (cache_key,)).fetchone()
+            if row is None:
+                logger.debug("Cache MISS: %s", cache_key)
+                self.counters['misses'] += 1
+                return None
+            self._db.execute("UPDATE queries SET last_access = ? WHERE cache_key = ?",
+                             (time.time(), cache_key))
+
+        expired = self._is_expired(cache_key, row[0])
+        with self._lock:
+            if expired:
+                logger.debug("Cache STALE: %s", cache_key)
+                self.counters['stale'] += 1
+            else:
+                logger.debug("Cache HIT: %s", cache_key)
+                self.counters['hits'] += 1
+        return {'fetched_at': row[0], 'expired': expired}
 
-    def _write_cache(self, cache_key: str, data: Dict):
-        """Write to cache."""
-        cache_path = self._get_cache_path(cache_key)
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+    def store(self, cache_key: str, resource: str, scope: Dict,
+              items: List[Dict], merge: bool = False):
+        """
+        Store the result of a query.
+
+        Unless merging a delta, objects previously cached in the query's
+        scope are replaced, so that objects which no longer match drop out.
+        """
+        self.begin_store(cache_key, resource, scope, merge)
+        self.store_page(resource, items)
+        self.finish_store(cache_key, resource, scope)
+
+    def begin_store(self, cache_key: str, resource: str, scope: Dict,
+                    merge: bool = False):
+        """
+        Start storing the result of a query page by page (see store()).
+
+        The query counts as uncached until finish_store(), so a fetch that
+        fails part way is fetched in full next time.
+        """
+        where, values = self._scope_sql(scope)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM queries WHERE cache_key = ?", (cache_key,))
+            if not merge:
+                self._db.execute(f"DELETE FROM objects WHERE resource = ?{where}",
+                                 [resource] + values)
+
+    def store_page(self, resource: str, items: List[Dict]):
+        """Store one page of objects for a query started with begin_store()."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._object_row(resource, item) for item in items))
+
+    def finish_store(self, cache_key: str, resource: str, scope: Dict):
+        """Record a query started with begin_store() as cached."""
+        where, values = self._scope_sql(scope)
+        with self._lock, self._db:
+            size = self._db.execute(
+                f"SELECT COALESCE(SUM(LENGTH(data)), 0) FROM objects WHERE resource = ?{where}",
+                [resource] + values).fetchone()[0]
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, resource, json.dumps(scope), now, now, size))
+        logger.debug("Cached: %s", cache_key)
+
+    def store_value(self, cache_key: str, value: Dict):
+        """Store a query result that is not a list of objects, e.g. totals."""
+        data = json.dumps(value)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO query_values VALUES (?, ?)",
+                             (cache_key, data))
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, 'counts', '{}', now, now, len(data)))
         logger.debug("Cached: %s", cache_key)
 
+    def load_value(self, cache_key: str) -> Optional[Dict]:
+        """Return a result stored with store_value()."""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM query_values WHERE cache_key = ?",
+                                   (cache_key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load(self, resource: str, scope: Dict,
+             between: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """Return the cached objects in scope, newest first."""
+        where, values = self._scope_sql(scope, between)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT data FROM objects WHERE resource = ?{where} "
+                "ORDER BY created_at DESC, id DESC", [resource] + values).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def export(self, authors: List[str], author_ids: List[int],
+               between: Tuple[str, str]) -> List[Dict]:
+        """
+        Return the cached issues, MRs and events of the given authors created
+        in the half-open range between, as flat rows with the raw object as
+        JSON in the data column.
+        """
+        columns = ('resource', 'id', 'author', 'author_id', 'year', 'state',
+                   'created_at', 'updated_at', 'data')
+        authors_sql = ", ".join("?" * len(authors))
+        author_ids_sql = ", ".join("?" * len(author_ids))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(columns)} FROM objects "
+                f"WHERE resource != 'users' "
+                f"AND (author IN ({authors_sql}) OR author_id IN ({author_ids_sql})) "
+                f"AND created_at >= ? AND created_at < ? "
+                f"ORDER BY resource, created_at, id",
+                list(authors) + list(author_ids) + list(between)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def high_water_mark(self, resource: str, scope: Dict) -> Optional[str]:
+        """Return the newest updated_at (or created_at) of the objects in scope."""
+        where, values = self._scope_sql(scope)
+        with self._lock:
+            return self._db.execute(
+                f"SELECT MAX(COALESCE(updated_at, created_at)) FROM objects "
+                f"WHERE resource = ?{where}", [resource] + values).fetchone()[0]
+
+    def count(self, resource: str, scope: Dict,
+              between: Optional[Tuple[str, str]] = None) -> int:
+        """Count the cached objects in scope."""
+        return sum(self.count_by(resource, scope, 'resource', between).values())
+
+    def count_by(self, resource: str, scope: Dict, expression: str,
+                 between: Optional[Tuple[str, str]] = None) -> Dict:
+        """Count the cached objects in scope, grouped by a SQL expression."""
+        return self.total_by(resource, scope, expression, '1', between)
+
+    def total(self, resource: str, scope: Dict, expression: str,
+              between: Optional[Tuple[str, str]] = None) -> int:
+        """Sum a SQL expression over the cached objects in scope."""
+        return sum(self.total_by(resource, scope, 'resource', expression, between).values())
+
+    def total_by(self, resource: str, scope: Dict, group: str, expression: str,
+                 between: Optional[Tuple[str, str]] = None) -> Dict:
+        """Sum a SQL expression over the cached objects in scope, grouped by another."""
+        where, values = self._scope_sql(scope, between)
+        with self._lock:
+            return dict(self._db.execute(
+                f"SELECT {group}, COALESCE(SUM({expression}), 0) FROM objects "
+                f"WHERE resource = ?{where} GROUP BY 1", [resource] + values))
+
+    def _evict(self, cache_key: str, resource: str, scope: Dict):
+        """Drop a query, its objects and any other query sharing them."""
+        if resource == 'counts':
+            self._db.execute("DELETE FROM query_values WHERE cache_key = ?", (cache_key,))
+            self._db.execute("DELETE FROM queries WHERE cache_key = ?", (cache_key,))
+            return
+        where, values = self._scope_sql(
+            {column: value for column, value in scope.items() if column != 'state'})
+        self._db.execute(f"DELETE FROM objects WHERE resource = ?{where}",
+                         [resource] + values)
+        # Queries over a sub- or superset of the slice (e.g. events filtered
+        # by action) have just lost objects too.
+        for key, other_scope in self._db.execute(
+                "SELECT cache_key, scope FROM queries WHERE resource = ?",
+                (resource,)).fetchall():
+            other_scope = json.loads(other_scope)
+            if all(other_scope.get(column) == value for column, value in scope.items()
+                   if column != 'state'):
+                self._db.execute("DELETE FROM queries WHERE cache_key = ?", (key,))
+
+    def sweep(self) -> int:
+        """
+        Evict least recently used queries until the cache fits max_bytes.
+
+        Returns:
+            Number of queries evicted
+        """
+        evicted = 0
+        with self._lock, self._db:
+            while True:
+                total = self._db.execute(
+                    "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM objects").fetchone()[0]
+                if total <= self.max_bytes:
+                    break
+                row = self._db.execute(
+                    "SELECT cache_key, resource, scope FROM queries "
+                    "ORDER BY last_access LIMIT 1").fetchone()
+                if row is None:
+                    break
+                self._evict(row[0], row[1], json.loads(row[2]))
+                evicted += 1
+        if evicted:
+            logger.debug("Evicted %d cache entries", evicted)
+            with self._lock:
+                self._db.execute("VACUUM")
+        return evicted
+
+    def close(self):
+        """Enforce the size budget, persist the counters and close the database."""
+        self.sweep()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO counters VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                self.counters.items())
+            self.counters = dict.fromkeys(self.counters, 0)
+        self._db.close()
+
+    def print_stats(self):
+        """Print cache size, expiry and hit/miss statistics."""
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters"))
+            queries = self._db.execute(
+                "SELECT cache_key, resource, fetched_at, size FROM queries").fetchall()
+            objects = self._db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        for name, value in self.counters.items():
+            counters[name] = counters.get(name, 0) + value
+
+        families: Dict[str, List[int]] = {}
+        expired = 0
+        for cache_key, resource, fetched_at, size in queries:
+            family = families.setdefault(resource, [0, 0])
+            family[0] += 1
+            family[1] += size
+            if self._is_expired(cache_key, fetched_at):
+                expired += 1
+        total_bytes = (self.cache_dir / self.DB_NAME).stat().st_size
+        lookups = sum(counters.get(name, 0) for name in ('hits', 'misses', 'stale'))
+
+        def ratio(count):
+            return f"{(count/lookups*100):.1f}%" if lookups > 0 else "N/A"
+
+        mib = 1024 * 1024
+        print(f"Cache database: {self.cache_dir / self.DB_NAME}")
+        print(f"{'Queries':<10} {len(queries):>8} ({expired} expired)")
+        print(f"{'Objects':<10} {objects:>8}")
+        print(f"{'Size':<10} {total_bytes/mib:>8.1f} MiB of {self.max_bytes/mib:.1f} MiB budget")
+        print(f"{'Lookups':<10} {lookups:>8}")
+        for name in ('hits', 'stale', 'misses'):
+            print(f"{name.capitalize():<10} {counters.get(name, 0):>8} {ratio(counters.get(name, 0)):>8}")
+        print("-"*40)
+        for family, (count, size) in sorted(families.items()):
+            print(f"{family:<10} {count:>8} queries {size/mib:>8.1f} MiB")
+
+
+class RunJournal(activity_common.RunJournal):
+    """
+    Run journal (see activity_common.RunJournal) that also records the
+    crawls: each page of a crawl stored in the cache, and each finished
+    crawl with its wall time. A crawl the interrupted run cut off continues
+    after the last page it stored, provided it is crawling with the same
+    params.
+    """
+
+    def __init__(self, cache_dir: str, run: Dict, resume: bool = False):
+        # Crawl key -> (params, pages stored) of crawls that haven't finished
+        self._crawls: Dict[str, Tuple[str, int]] = {}
+        super().__init__(cache_dir, run, resume)
+
+    def _replay_record(self, record: Dict):
+        if 'page' in record:
+            self._crawls[record['crawl']] = (record['params'], record['page'])
+        elif 'crawl' in record:
+            self._crawls.pop(record['crawl'], None)
+            self.timings.append((record['crawl'], record['seconds']))
+
+    def resume_page(self, crawl: str, params: Dict) -> int:
+        """
+        Return how many pages of a crawl the resumed run already stored, or
+        0 if it has to start from the beginning.
+        """
+        params_json, pages = self._crawls.pop(crawl, (None, 0))
+        return pages if params_json == json.dumps(params, sort_keys=True) else 0
+
+    def record_page(self, crawl: str, params: Dict, page: int):
+        self._write({'crawl': crawl, 'params': json.dumps(params, sort_keys=True),
+                     'page': page})
+
+    def record_crawl(self, crawl: str, seconds: float, pages: int, items: int):
+        self.timings.append((crawl, seconds))
+        self._write({'crawl': crawl, 'seconds': round(seconds, 3),
+                     'pages': pages, 'items': items})
+
+
+def journal_unit(fetch_func: Callable, username: str, period: DateRange) -> str:
+    """Journal key of one report unit: a stats method for a user and period."""
+    return f"{fetch_func.__name__}/{username}/{period.key}"
+
+
+class _GitLabClientBase:
+    """Caching, query construction and stats shared by the GitLab clients."""
+
+    def __init__(self, base_url: str, token: str, cache_dir: str = ".cache",
+                 use_cache: bool = True, refresh: bool = False,
+                 details: bool = False, monthly: bool = False, max_retries: int = 5,
+                 cache_ttls: Optional[Dict[str, Tuple]] = None,
+                 cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 journal: Optional[RunJournal] = None):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.refresh = refresh
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter()
+        self.metrics = RequestMetrics('gitlab_activity')
+        # Without details, issue and MR stats come from server-side totals
+        # rather than from crawling every object. Per-month breakdowns are
+        # sliced from the crawled objects, so they imply details.
+        self.details = details or monthly
+        self.monthly = monthly
+        self.cache = GitLabCache(cache_dir, use_cache, cache_ttls, cache_max_bytes)
+        self.journal = journal
+
+    def _plan_fetch(self, query: CollectionQuery) -> Tuple[Optional[Dict], bool]:
+        """
+        Decide how to satisfy a cached collection query.
+
+        A cached query is used as is, unless refreshing or it has expired,
+        in which case only the objects changed since its high-water mark
+        are requested.
+
+        Returns:
+            Tuple of (params to fetch with or None, whether they fetch a delta)
+        """
+        cached = self.cache.lookup(query.cache_key)
+        if cached is None:
+            return query.params, False
+        if not self.refresh and not cached['expired']:
+            return None, False
+        mark = self.cache.high_water_mark(query.resource, query.scope)
+        if not mark:
+            # Nothing to measure changes against (e.g. an empty result)
+            return query.params, False
+
+        logger.debug("Cache REFRESH: %s since %s", query.cache_key, mark)
+        if query.delta_key == 'after':
+            # The Events API only filters by (exclusive) date and events are
+            # never edited, so refetch from the day before the mark.
+            day_before = (date.fromisoformat(mark[:10]) - timedelta(days=1)).isoformat()
+            return {**query.params, 'after': max(query.params['after'], day_before)}, True
+        return {**query.params, query.delta_key: mark}, True
+
+    def _plan_crawl(self, queries: List[CollectionQuery]
+                    ) -> Tuple[List[List[CollectionQuery]], List[Tuple[CollectionQuery, Dict]]]:
+        """
+        Decide how to satisfy a run of consecutive per-year queries.
+
+        Years that have to be fetched in full are merged into spans of
+        consecutive years, and each span is crawled as one query, so
+        widening a range only fetches the years not yet cached, and a run
+        of missing years costs one crawl rather than one per year.
+
+        Returns:
+            Tuple of (spans of queries to crawl in full, list of
+            (query, params) deltas to fetch one by one)
+        """
+        spans: List[List[CollectionQuery]] = []
+        deltas: List[Tuple[CollectionQuery, Dict]] = []
+        extend_span = False
+        for query in queries:
+            params, is_delta = self._plan_fetch(query)
+            if params is not None and is_delta:
+                deltas.append((query, params))
+            elif params is not None:
+                if extend_span:
+                    spans[-1].append(query)
+                else:
+                    spans.append([query])
+            extend_span = params is not None and not is_delta
+        return spans, deltas
+
+    @staticmethod
+    def _span_params(span: List[CollectionQuery]) -> Dict:
+        """Params covering a span of per-year queries: first start to last end."""
+        first = span[0].params
+        return {**span[-1].params,
+                **{key: first[key] for key in ('created_after', 'after') if key in first}}
+
+    def _resume_page(self, queries: List[CollectionQuery], fetch_params: Dict) -> int:
+        """Pages of a crawl already stored by the run being resumed, if any."""
+        if self.journal is None:
+            return 0
+        pages = self.journal.resume_page(self._crawl_key(queries), fetch_params)
+        if pages:
+            logger.debug("Resuming %s after page %d", queries[0].description, pages)
+        return pages
+
+    @staticmethod
+    def _crawl_key(queries: List[CollectionQuery]) -> str:
+        return ",".join(query.cache_key for query in queries)
+
+    def _store_fetched(self, queries: List[CollectionQuery], pages: Iterable[List[Dict]],
+                       is_delta: bool, fetch_params: Dict, resumed_pages: int = 0):
+        """
+        Cache freshly fetched objects as their pages arrive, merging a delta
+        into what is stored.
+
+        The pages may cover several queries (a span of years); each object
+        lands in its own year's slice. Nothing is touched until the first
+        page has arrived. A crawl resumed after resumed_pages pages carries
+        on storing where it stopped.
+        """
+        start = time.perf_counter()
+        pages = iter(pages)
+        first_page = next(pages)
+        if not resumed_pages:
+            self._begin_fetched(queries, is_delta)
+        count = 0
+        for page, items in enumerate(chain([first_page], pages), resumed_pages + 1):
+            self._store_page(queries, fetch_params, page, items)
+            count += len(items)
+        self._finish_fetched(queries, count, is_delta, page, time.perf_counter() - start)
+
+    def _begin_fetched(self, queries: List[CollectionQuery], is_delta: bool):
+        for query in queries:
+            self.cache.begin_store(query.cache_key, query.resource, query.scope,
+                                   merge=is_delta)
+
+    def _store_page(self, queries: List[CollectionQuery], fetch_params: Dict,
+                    page: int, items: List[Dict]):
+        self.cache.store_page(queries[0].resource, items)
+        if self.journal is not None:
+            self.journal.record_page(self._crawl_key(queries), fetch_params, page)
+
+    def _finish_fetched(self, queries: List[CollectionQuery], count: int, is_delta: bool,
+                        pages: int, seconds: float):
+        cache_keys = ", ".join(query.cache_key for query in queries)
+        if is_delta:
+            logger.debug("Refreshed %s: %d changed items", cache_keys, count)
+        else:
+            logger.debug("Retrieved %d items for %s", count, cache_keys)
+        for query in queries:
+            self.cache.finish_store(query.cache_key, query.resource, query.scope)
+        if self.journal is not None:
+            self.journal.record_crawl(self._crawl_key(queries), seconds, pages, count)
+
+    def _cached_counts(self, cache_key: str) -> Optional[Dict]:
+        """Return cached totals unless missing, expired or refreshing."""
+        cached = self.cache.lookup(cache_key)
+        if cached is None or cached['expired'] or self.refresh:
+            return None
+        return self.cache.load_value(cache_key)
+
+    @staticmethod
+    def _total_from_headers(headers) -> Optional[int]:
+        """
+        Read the x-total header of a paginated response.
+
+        GitLab leaves it out when the total is too expensive to count
+        (over 10,000 results), in which case None is returned.
+        """
+        total = headers.get('x-total', '')
+        return int(total) if total.isdigit() else None
+
+    def _api_url(self, endpoint: str) -> str:
+        """Build the full URL for an API v4 endpoint."""
+        return urljoin(f"{self.base_url}/api/v4/", endpoint)
+
+    @staticmethod
+    def _user_query(username: str) -> CollectionQuery:
+        """Query for a user by username."""
+        return CollectionQuery(f"user_{username}", 'users', {'username': username},
+                               'users', {'author': username}, f"user {username}")
+
+    @staticmethod
+    def _authored_params(username: str, period: DateRange) -> Dict:
+        """Params selecting the issues/MRs a user authored in period."""
+        return {
+            'author_username': username,
+            'scope': 'all',
+            'created_after': f"{period.since}T00:00:00Z",
+            'created_before': f"{period.until}T23:59:59Z"
+        }
+
+    @staticmethod
+    def _counts_key(resource: str, username: str, period: DateRange) -> str:
+        """Cache key for server-side totals of issues/MRs over period."""
+        return f"counts_{resource}_{username}_{period.key}"
+
+    def _authored_in_year_query(self, resource: str, endpoint: str, username: str,
+                                year: int) -> CollectionQuery:
+        """Query for issues/MRs authored by a user in a year."""
+        return CollectionQuery(
+            f"{resource}_{username}_{year}",
+            endpoint,
+            self._authored_params(username, DateRange.for_year(year)),
+            resource,
+            {'author': username, 'year': year},
+            f"{resource} for {username}")
+
+    def _issues_query(self, username: str, year: int) -> CollectionQuery:
+        return self._authored_in_year_query('issues', 'issues', username, year)
+
+    def _merge_requests_query(self, username: str, year: int) -> CollectionQuery:
+        return self._authored_in_year_query('mrs', 'merge_requests', username, year)
+
+    @staticmethod
+    def _events_query(user_id: int, year: int) -> CollectionQuery:
+        """Query for a user's events in a year."""
+        # after and before are both exclusive dates
+        return CollectionQuery(f"events_{user_id}_{year}",
+                               f'users/{user_id}/events',
+                               {'after': f"{year-1}-12-31", 'before': f"{year+1}-01-01"},
+                               'events', {'author_id': user_id, 'year': year},
+                               f"events for user {user_id}", delta_key='after')
+
+    @staticmethod
+    def _yearly_queries(make_query: Callable, subject, period: DateRange) -> List[CollectionQuery]:
+        """The per-year queries, for make_query(subject, year), covering period."""
+        return [make_query(subject, year) for year in period.years()]
+
+    def _cached_user_id(self, username: str) -> Optional[int]:
+        """Return a user's ID if the user lookup is cached."""
+        query = self._user_query(username)
+        cached = self.cache.lookup(query.cache_key)
+        if cached and not cached['expired']:
+            users = self.cache.load(query.resource, query.scope)
+            if users:
+                return users[0]['id']
+        return None
+
+    def _store_user(self, username: str, user_data: Dict):
+        # Unknown users are deliberately not cached, so they are retried.
+        query = self._user_query(username)
+        self.cache.store(query.cache_key, query.resource, query.scope, [user_data])
+
+    def export_objects(self, usernames: List[str], period: DateRange) -> List[Dict]:
+        """Return the cached objects of usernames created in period as flat rows."""
+        user_ids = [user_id for user_id in map(self._cached_user_id, usernames) if user_id]
+        return self.cache.export(usernames, user_ids, period.bounds())
+
+    @staticmethod
+    def _by_month(period: DateRange, totals: Dict) -> Dict[str, int]:
+        """Spread totals keyed by YYYY-MM over every month of period."""
+        return {month: totals.get(month, 0) for month in period.months()}
+
+    def _issue_stats(self, username: str, period: DateRange,
+                     counts: Optional[Dict] = None) -> Dict:
+        """Build the issue stats result from totals or the cached issues."""
+        result = {'username': username}
+        if counts is None:
+            scope = {'author': username}
+            by_month = self.cache.count_by('issues', scope, MONTH_SQL, period.bounds())
+            counts = {'all': sum(by_month.values())}
+            if self.monthly:
+                result['by_month'] = self._by_month(period, by_month)
+        return {**result, 'issue_count': counts['all'], 'status': 'success'}
+
+    def _mr_stats(self, username: str, period: DateRange,
+                  counts: Optional[Dict] = None) -> Dict:
+        """Build the MR stats result from totals or the cached merge requests."""
+        result = {'username': username}
+        if counts is None:
+            scope = {'author': username}
+            # Count by state
+            by_state = self.cache.count_by('mrs', scope, 'state', period.bounds())
+            counts = {'all': sum(by_state.values()), 'merged': by_state.get('merged', 0)}
+            if self.monthly:
+                result['by_month'] = self._by_month(
+                    period, self.cache.count_by('mrs', scope, MONTH_SQL, period.bounds()))
+
+        return {
+            **result,
+            'opened': counts['all'],
+            'merged': counts['merged'],
+            'status': 'success'
+        }
+
+    def _commit_stats(self, username: str, user_id: int, period: DateRange) -> Dict:
+        """Build the commit stats result from the cached push events."""
+        scope = {'author_id': user_id, 'state': 'pushed'}
+        # push_data contains the commit count for each push
+        by_month = self.cache.total_by('events', scope, MONTH_SQL,
+                                       "json_extract(data, '$.push_data.commit_count')",
+                                       period.bounds())
+        commit_count = sum(by_month.values())
+
+        logger.debug("User %s: %d commits from %d push events",
+                    username, commit_count, self.cache.count('events', scope, period.bounds()))
+
+        result = {
+            'username': username,
+            'commit_count': commit_count,
+            'status': 'success'
+        }
+        if self.monthly:
+            result['by_month'] = self._by_month(period, by_month)
+        return result
+
+    def _comment_stats(self, username: str, user_id: int, period: DateRange) -> Dict:
+        """Build the comment stats result from the cached comment events."""
+        scope = {'author_id': user_id, 'state': 'commented'}
+        # Count by noteable_type: Issue, MergeRequest, or Commit
+        by_type = self.cache.count_by('events', scope,
+                                      "json_extract(data, '$.note.noteable_type')",
+                                      period.bounds())
+
+        result = {
+            'username': username,
+            'issues_commented': by_type.get('Issue', 0),
+            'mrs_commented': by_type.get('MergeRequest', 0),
+            'status': 'success'
+        }
+        if self.monthly:
+            result['by_month'] = self._by_month(period, self.cache.total_by(
+                'events', scope, MONTH_SQL,
+                "json_extract(data, '$.note.noteable_type') IN ('Issue', 'MergeRequest')",
+                period.bounds()))
+        return result
+
+
+class GitLabAPI(_GitLabClientBase):
+    """Simple GitLab API client with caching."""
+
+    def __init__(self, base_url: str, token: str, cache_dir: str = ".cache",
+                 use_cache: bool = True, refresh: bool = False,
+                 pool_size: int = 10, page_fanout: int = 4, **options):
+        super().__init__(base_url, token, cache_dir, use_cache, refresh, **options)
+        self.page_fanout = page_fanout
+        self.session = requests.Session()
+        self.session.headers.update({
+            'PRIVATE-TOKEN': token,
+            'Content-Type': 'application/json'
+        })
+
+        # The session is shared by the worker threads in run_report(),
+        # so size the connection pool to match instead of urllib3's default
+        # of 10, which would otherwise make extra workers wait or reconnect.
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                                pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # User IDs and event crawls are needed by several report phases;
+        # remember them so concurrent phases don't race each other to the
+        # same endpoint.
+        self._memo: Dict[str, object] = {}
+        self._memo_locks: Dict[str, threading.Lock] = {}
+        self._memo_guard = threading.Lock()
+
+        # Pages 2..N of a paginated query are prefetched on this pool. It is
+        # separate from the per-user pool in main() so that a user worker
+        # waiting on its pages can never starve the page fetches.
+        self._page_executor = None
+        if page_fanout > 1:
+            self._page_executor = ThreadPoolExecutor(max_workers=page_fanout)
+
+    def _request(self, url: str, params: Optional[Dict] = None,
+                 json_body: Optional[Dict] = None) -> requests.Response:
+        """
+        GET a URL (or POST json_body to it), paced by the rate limiter and
+        retried on transient errors.
+
+        429s, 5xx responses and connection errors are retried up to
+        max_retries times with backoff_delay(). Because each page is retried
+        on its own, a crawl resumes from the page that failed rather than
+        starting over.
+        """
+        endpoint = endpoint_name(url)
+        for attempt in range(self.max_retries + 1):
+            wait = self.rate_limiter.reserve()
+            if wait > 0:
+                time.sleep(wait)
+                self.metrics.record_sleep('rate_limit', wait)
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request('GET' if json_body is None else 'POST',
+                                                url, params=params, json=json_body)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.metrics.record_request(endpoint, time.perf_counter() - start, 'error')
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.debug("Retrying %s in %.1fs: %s", url, delay, e)
+                time.sleep(delay)
+                self.metrics.record_sleep('backoff', delay)
+                continue
+            self.metrics.record_request(endpoint, time.perf_counter() - start,
+                                        response.status_code, len(response.content))
+
+            self.rate_limiter.update(response.headers)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = backoff_delay(attempt, response.headers)
+                logger.debug("Retrying %s in %.1fs: HTTP %d", url, delay, response.status_code)
+                time.sleep(delay)
+                self.metrics.record_sleep('backoff', delay)
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def _get_page(self, url: str, params: Dict, page: int) -> requests.Response:
+        """Fetch a single page of a paginated endpoint."""
+        logger.debug("GET %s (page %d)", url, page)
+        return self._request(url, {**params, 'page': page})
+
     def _make_request(self, endpoint: str, params: Dict = None) -> List[Dict]:
-        """Make API request with pagination."""
-        url = urljoin(f"{self.base_url}/api/v4/", endpoint)
-        all_results = []
-        page = 1
+        """Make API request with pagination, returning all results at once."""
+        all_results = [item for items in self._iter_pages(endpoint, params)
+                       for item in items]
+        logger.debug("Retrieved %d items from %s", len(all_results), endpoint)
+        return all_results
+
+    def _iter_pages(self, endpoint: str, params: Dict = None,
+                    first_page: int = 1) -> Iterator[List[Dict]]:
+        """
+        Make API request with pagination, yielding the results page by page,
+        starting from first_page.
+
+        Once the first page reports x-total-pages, the remaining pages are
+        fetched concurrently (up to page_fanout at a time) and yielded in
+        page order; at most page_fanout pages are held ahead of the caller.
+        GitLab omits that header when the total is too expensive to count,
+        so in that case the next links are followed one page at a time
+        instead.
+        """
+        url = self._api_url(endpoint)
         per_page = 100
 
-        if params is None:
-            params = {}
+        params = dict(params or {})
         params['per_page'] = per_page
 
-        while True:
-            params['page'] = page
-            logger.debug("GET %s (page %d)", endpoint, page)
+        response = self._get_page(url, params, first_page)
+        yield response.json()
 
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
+        total_pages = response.headers.get('x-total-pages', '')
+        if not total_pages.isdigit():
+            yield from self._follow_next_pages(url, params, response, first_page)
+            return
 
-            results = response.json()
-            if not results:
-                break
+        remaining = iter(range(first_page + 1, int(total_pages) + 1))
+        if self._page_executor is None:
+            for page in remaining:
+                yield self._get_page(url, params, page).json()
+            return
 
-            all_results.extend(results)
+        window = deque(self._page_executor.submit(self._get_page, url, params, page)
+                       for page in islice(remaining, self.page_fanout))
+        try:
+            while window:
+                page_response = window.popleft().result()
+                for page in islice(remaining, 1):
+                    window.append(self._page_executor.submit(self._get_page, url, params, page))
+                yield page_response.json()
+        finally:
+            for future in window:
+                future.cancel()
+
+    def _follow_next_pages(self, url: str, params: Dict, response: requests.Response,
+                           page: int = 1) -> Iterator[List[Dict]]:
+        """
+        Sequentially fetch the pages after response, which is page page.
 
-            # Check if there are more pages
-            if 'x-next-page' not in response.headers or not response.headers['x-next-page']:
+        Prefers the Link rel="next" URL, which is what keyset pagination
+        hands back, and falls back to the x-next-page offset header.
+        """
+        while response.json():
+            next_link = response.links.get('next', {}).get('url')
+            if next_link:
+                page += 1
+                logger.debug("GET %s (page %d)", next_link, page)
+                response = self._request(next_link)
+            elif response.headers.get('x-next-page'):
+                page = int(response.headers['x-next-page'])
+                response = self._get_page(url, params, page)
+            else:
                 break
+            yield response.json()
 
-            page += 1
-
-        logger.debug("Retrieved %d items from %s", len(all_results), endpoint)
-        return all_results
+    def _once(self, key: str, func: Callable):
+        """Call func() the first time key is requested; reuse its result after."""
+        with self._memo_guard:
+            lock = self._memo_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._memo:
+                self._memo[key] = func()
+            return self._memo[key]
 
     def get_user_id(self, username: str) -> Optional[int]:
         """Get user ID from username."""
-        cache_key = f"user_{username}"
-        cached = self._read_cache(cache_key)
+        return self._once(f"user_{username}", lambda: self._lookup_user_id(username))
 
-        if cached:
-            return cached.get('id')
+    def _lookup_user_id(self, username: str) -> Optional[int]:
+        """Resolve a username to its ID via the cache or the API."""
+        user_id = self._cached_user_id(username)
+        if user_id:
+            return user_id
 
         try:
             users = self._make_request('users', {'username': username})
             if users:
                 user_data = users[0]
-                self._write_cache(cache_key, user_data)
+                self._store_user(username, user_data)
                 return user_data['id']
         except requests.exceptions.RequestException as e:
             logger.debug("Error fetching user %s: %s", username, e)
 
         return None
 
-    def get_user_issues(self, username: str, year: int) -> List[Dict]:
-        """Get issues created by user in a specific year."""
-        cache_key = f"issues_{username}_{year}"
-        cached = self._read_cache(cache_key)
-
-        if cached:
-            return cached
-
-        try:
-            issues = self._make_request('issues', {
-                'author_username': username,
-                'scope': 'all',
-                'created_after': f"{year}-01-01T00:00:00Z",
-                'created_before': f"{year}-12-31T23:59:59Z"
-            })
-            self._write_cache(cache_key, issues)
-            return issues
-        except requests.exceptions.RequestException as e:
-            logger.debug("Error fetching issues for %s: %s", username, e)
-            return []
+    def _sync_collections(self, queries: List[CollectionQuery]):
+        """
+        Make sure the cache holds the results of consecutive per-year
+        queries, fetching if needed.
+
+        Missing years are crawled in spans (see _plan_crawl()). With refresh
+        enabled, or once a cached query has expired, only objects changed
+        since its high-water mark are fetched and merged. Pages are written
+        to the cache as they arrive. Request errors are logged; a fetch that
+        fails part way leaves its queries uncached, so they are fetched in
+        full next time.
+        """
+        spans, deltas = self._plan_crawl(queries)
+        fetches = [(span, self._span_params(span), False) for span in spans]
+        fetches += [([query], params, True) for query, params in deltas]
+
+        for span, fetch_params, is_delta in fetches:
+            try:
+                resumed_pages = self._resume_page(span, fetch_params)
+                pages = self._iter_pages(span[0].endpoint, fetch_params, resumed_pages + 1)
+                self._store_fetched(span, pages, is_delta, fetch_params, resumed_pages)
+            except requests.exceptions.RequestException as e:
+                logger.debug("Error fetching %s: %s", span[0].description, e)
+
+    def _fetch_total(self, endpoint: str, params: Dict) -> Optional[int]:
+        """Count the results of a query by fetching a one-item page."""
+        response = self._get_page(self._api_url(endpoint), {**params, 'per_page': 1}, 1)
+        return self._total_from_headers(response.headers)
+
+    def get_user_issue_counts(self, username: str, period: DateRange) -> Dict:
+        """
+        Get server-side issue totals for a user over a date range.
 
-    def get_user_merge_requests(self, username: str, year: int) -> List[Dict]:
-        """Get merge requests created by user in a specific year."""
-        cache_key = f"mrs_{username}_{year}"
-        cached = self._read_cache(cache_key)
+        Uses the issues_statistics endpoint, so no issues are downloaded.
 
-        if cached:
-            return cached
+        Returns:
+            Dictionary with 'all', 'opened' and 'closed' counts
+        """
+        cache_key = self._counts_key('issues', username, period)
+        counts = self._cached_counts(cache_key)
+        if counts is None:
+            logger.debug("GET issues_statistics for %s", username)
+            response = self._request(self._api_url('issues_statistics'),
+                                     self._authored_params(username, period))
+            counts = response.json()['statistics']['counts']
+            self.cache.store_value(cache_key, counts)
+        return counts
+
+    def get_user_merge_request_counts(self, username: str, period: DateRange) -> Dict:
+        """
+        Get server-side MR totals for a user over a date range.
 
-        try:
-            mrs = self._make_request('merge_requests', {
-                'author_username': username,
-                'scope': 'all',
-                'created_after': f"{year}-01-01T00:00:00Z",
-                'created_before': f"{year}-12-31T23:59:59Z"
-            })
-            self._write_cache(cache_key, mrs)
-            return mrs
-        except requests.exceptions.RequestException as e:
-            logger.debug("Error fetching MRs for %s: %s", username, e)
-            return []
+        Reads x-total from one-item pages of the opened and merged queries,
+        falling back to a full crawl if GitLab won't report the total.
 
-    def get_user_mr_stats(self, username: str, year: int) -> Dict:
+        Returns:
+            Dictionary with 'all' and 'merged' counts
+        """
+        cache_key = self._counts_key('mrs', username, period)
+        counts = self._cached_counts(cache_key)
+        if counts is None:
+            params = self._authored_params(username, period)
+            counts = {
+                'all': self._fetch_total('merge_requests', params),
+                'merged': self._fetch_total('merge_requests', {**params, 'state': 'merged'})
+            }
+            if None in counts.values():
+                self._sync_merge_requests(username, period)
+                stats = self._mr_stats(username, period)
+                counts = {'all': stats['opened'], 'merged': stats['merged']}
+            self.cache.store_value(cache_key, counts)
+        return counts
+
+    def _sync_issues(self, username: str, period: DateRange):
+        self._sync_collections(self._yearly_queries(self._issues_query, username, period))
+
+    def _sync_merge_requests(self, username: str, period: DateRange):
+        self._sync_collections(
+            self._yearly_queries(self._merge_requests_query, username, period))
+
+    def get_user_issues(self, username: str, period: DateRange) -> List[Dict]:
+        """Get issues created by user over a date range."""
+        self._sync_issues(username, period)
+        return self.cache.load('issues', {'author': username}, period.bounds())
+
+    def get_user_merge_requests(self, username: str, period: DateRange) -> List[Dict]:
+        """Get merge requests created by user over a date range."""
+        self._sync_merge_requests(username, period)
+        return self.cache.load('mrs', {'author': username}, period.bounds())
+
+    def get_user_mr_stats(self, username: str, period: DateRange) -> Dict:
         """
-        Get MR statistics for a user in a specific year.
+        Get MR statistics for a user over a date range.
 
         Returns:
             Dictionary with username, opened count, merged count, and status
         """
         try:
-            mrs = self.get_user_merge_requests(username, year)
-
-            # Count by state
-            total = len(mrs)
-            merged = sum(1 for mr in mrs if mr.get('state') == 'merged')
-
-            return {
-                'username': username,
-                'opened': total,
-                'merged': merged,
-                'status': 'success'
-            }
+            if not self.details:
+                return self._mr_stats(username, period,
+                                      self.get_user_merge_request_counts(username, period))
+            self._sync_merge_requests(username, period)
+            return self._mr_stats(username, period)
         except requests.exceptions.RequestException as e:
             logger.debug("Error getting MR stats for %s: %s", username, e)
-            return {
-                'username': username,
-                'opened': 0,
-                'merged': 0,
-                'status': 'error',
-                'error': str(e)
-            }
+            return error_result(username, self.get_user_mr_stats, str(e))
 
-    def get_user_issue_stats(self, username: str, year: int) -> Dict:
+    def get_user_issue_stats(self, username: str, period: DateRange) -> Dict:
         """
-        Get issue statistics for a user in a specific year.
+        Get issue statistics for a user over a date range.
 
         Returns:
             Dictionary with username, issue count, and status
         """
         try:
-            issues = self.get_user_issues(username, year)
-
-            return {
-                'username': username,
-                'issue_count': len(issues),
-                'status': 'success'
-            }
+            if not self.details:
+                return self._issue_stats(username, period,
+                                         self.get_user_issue_counts(username, period))
+            self._sync_issues(username, period)
+            return self._issue_stats(username, period)
         except requests.exceptions.RequestException as e:
             logger.debug("Error getting issue stats for %s: %s", username, e)
-            return {
-                'username': username,
-                'issue_count': 0,
-                'status': 'error',
-                'error': str(e)
-            }
+            return error_result(username, self.get_user_issue_stats, str(e))
 
-    def get_user_events(self, user_id: int, year: int, action: Optional[str] = None) -> List[Dict]:
+    def get_user_events(self, user_id: int, period: DateRange,
+                        action: Optional[str] = None) -> List[Dict]:
         """
-        Get events for a user in a specific year.
+        Get events for a user over a date range.
 
         Args:
             user_id: GitLab user ID
-            year: Year to filter events
+            period: Date range to filter events
             action: Optional action filter (e.g., 'pushed', 'commented', 'opened')
 
         Returns:
             List of event dictionaries
         """
-        action_suffix = f"_{action}" if action else ""
-        cache_key = f"events_{user_id}_{year}{action_suffix}"
-        cached = self._read_cache(cache_key)
+        self._sync_events(user_id, period)
+        scope = {'author_id': user_id, **({'state': action} if action else {})}
+        return self.cache.load('events', scope, period.bounds())
 
-        if cached:
-            return cached
+    def _sync_events(self, user_id: int, period: DateRange):
+        """
+        Make sure a user's events over a date range are cached.
 
-        try:
-            params = {
-                'after': f"{year}-01-01",
-                'before': f"{year+1}-01-01"
-            }
-            if action:
-                params['action'] = action
+        All events-derived stats read from this, so a user's events are
+        crawled once (unfiltered) rather than once per action.
+        """
+        self._once(f"events_{user_id}_{period.key}",
+                   lambda: self._sync_collections(
+                       self._yearly_queries(self._events_query, user_id, period)))
 
-            events = self._make_request(f'users/{user_id}/events', params)
-            self._write_cache(cache_key, events)
-            return events
-        except requests.exceptions.RequestException as e:
-            logger.debug("Error fetching events for user %d: %s", user_id, e)
-            return []
+    def get_user_events_by_action(self, user_id: int,
+                                  period: DateRange) -> Dict[str, List[Dict]]:
+        """
+        Get a user's events over a date range, grouped by action.
 
-    def get_user_commit_stats(self, username: str, year: int) -> Dict:
+        Returns:
+            Dictionary mapping action filter name (e.g. 'pushed') to events
         """
-        Get commit statistics for a user in a specific year.
+        return bucket_events_by_action(self.get_user_events(user_id, period))
 
-        Uses the Events API with action=pushed filter to count commits.
+    def get_user_commit_stats(self, username: str, period: DateRange) -> Dict:
+        """
+        Get commit statistics for a user over a date range.
+
+        Sums the commit counts of the push events from the user's Events
+        API crawl.
 
         Returns:
             Dictionary with username, commit count, and status
@@ -289,45 +1371,19 @@ class GitLabAPI:
             # First get the user ID
             user_id = self.get_user_id(username)
             if not user_id:
-                return {
-                    'username': username,
-                    'commit_count': 0,
-                    'status': 'error',
-                    'error': 'User not found'
-                }
-
-            # Fetch push events for the user (using action=pushed filter)
-            events = self.get_user_events(user_id, year, action='pushed')
-
-            # Count commits from push events
-            # push_data contains the commit count for each push
-            commit_count = 0
-            for event in events:
-                push_data = event.get('push_data', {})
-                commit_count += push_data.get('commit_count', 0)
-
-            logger.debug("User %s: %d commits from %d push events",
-                        username, commit_count, len(events))
-
-            return {
-                'username': username,
-                'commit_count': commit_count,
-                'status': 'success'
-            }
+                return error_result(username, self.get_user_commit_stats, USER_NOT_FOUND)
+
+            self._sync_events(user_id, period)
+            return self._commit_stats(username, user_id, period)
         except requests.exceptions.RequestException as e:
             logger.debug("Error getting commit stats for %s: %s", username, e)
-            return {
-                'username': username,
-                'commit_count': 0,
-                'status': 'error',
-                'error': str(e)
-            }
+            return error_result(username, self.get_user_commit_stats, str(e))
 
-    def get_user_comment_stats(self, username: str, year: int) -> Dict:
+    def get_user_comment_stats(self, username: str, period: DateRange) -> Dict:
         """
-        Get comment statistics for a user in a specific year.
+        Get comment statistics for a user over a date range.
 
-        Uses the Events API with action=commented filter to count comments.
+        Counts the comment events from the user's Events API crawl.
 
         Returns:
             Dictionary with username, issues_commented, mrs_commented, and status
@@ -336,36 +1392,501 @@ class GitLabAPI:
             # First get the user ID
             user_id = self.get_user_id(username)
             if not user_id:
-                return {
-                    'username': username,
-                    'issues_commented': 0,
-                    'mrs_commented': 0,
-                    'status': 'error',
-                    'error': 'User not found'
-                }
-
-            # Fetch comment events (action=commented returns only comment events)
-            events = self.get_user_events(user_id, year, action='commented')
-
-            # Count by noteable_type: Issue, MergeRequest, or Commit
-            issues_commented = sum(1 for e in events if e.get('note', {}).get('noteable_type') == 'Issue')
-            mrs_commented = sum(1 for e in events if e.get('note', {}).get('noteable_type') == 'MergeRequest')
-
-            return {
-                'username': username,
-                'issues_commented': issues_commented,
-                'mrs_commented': mrs_commented,
-                'status': 'success'
-            }
+                return error_result(username, self.get_user_comment_stats, USER_NOT_FOUND)
+
+            self._sync_events(user_id, period)
+            return self._comment_stats(username, user_id, period)
         except requests.exceptions.RequestException as e:
             logger.debug("Error getting comment stats for %s: %s", username, e)
-            return {
-                'username': username,
-                'issues_commented': 0,
-                'mrs_commented': 0,
-                'status': 'error',
-                'error': str(e)
+            return error_result(username, self.get_user_comment_stats, str(e))
+
+
+class GraphQLError(requests.exceptions.RequestException):
+    """A GraphQL response that carried errors instead of (complete) data."""
+
+
+class GitLabGraphQLAPI(GitLabAPI):
+    """
+    GitLabAPI variant that batches users through the GraphQL API.
+
+    User IDs, issue totals and opened/merged MR totals are fetched for
+    batch_size users per aliased query. The events-based commit and comment
+    stats still come from the REST Events API, as does everything when
+    details are requested.
+    """
+
+    def __init__(self, *args, batch_size: int = 10, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self._batches: Dict[str, List[str]] = {}
+
+    def plan_batches(self, usernames: List[str]):
+        """Split the users to be reported on into GraphQL query batches."""
+        for i in range(0, len(usernames), self.batch_size):
+            batch = usernames[i:i + self.batch_size]
+            for username in batch:
+                self._batches[username] = batch
+
+    def _batch_of(self, username: str) -> List[str]:
+        return self._batches.get(username, [username])
+
+    def _graphql(self, query: str, variables: Dict) -> Dict:
+        """Run a GraphQL query and return its data."""
+        logger.debug("POST graphql (%d variables)", len(variables))
+        response = self._request(f"{self.base_url}/api/graphql",
+                                 json_body={'query': query, 'variables': variables})
+        body = response.json()
+        if body.get('errors'):
+            raise GraphQLError("; ".join(error.get('message', str(error))
+                                         for error in body['errors']))
+        return body['data']
+
+    def get_user_id(self, username: str) -> Optional[int]:
+        """Get user ID from username, resolving the user's whole batch at once."""
+        def resolve():
+            batch = self._batch_of(username)
+            user_ids = self._once(f"graphql_users_{'_'.join(batch)}",
+                                  lambda: self._resolve_user_ids(batch))
+            return user_ids.get(username)
+        return self._once(f"user_{username}", resolve)
+
+    def _resolve_user_ids(self, usernames: List[str]) -> Dict[str, int]:
+        """Look up user IDs for usernames with one users(usernames:) query."""
+        user_ids = {}
+        missing = []
+        for username in usernames:
+            user_id = self._cached_user_id(username)
+            if user_id:
+                user_ids[username] = user_id
+            else:
+                missing.append(username)
+        if not missing:
+            return user_ids
+
+        try:
+            data = self._graphql(
+                "query($usernames: [String!]) {"
+                " users(usernames: $usernames) { nodes { id username } } }",
+                {'usernames': missing})
+        except requests.exceptions.RequestException as e:
+            logger.debug("Error fetching users %s: %s", ", ".join(missing), e)
+            return user_ids
+
+        for node in data['users']['nodes']:
+            # GraphQL IDs are global IDs such as gid://gitlab/User/123
+            user_data = {'id': int(node['id'].rsplit('/', 1)[-1]),
+                         'username': node['username']}
+            self._store_user(node['username'], user_data)
+            user_ids[node['username']] = user_data['id']
+        return user_ids
+
+    @staticmethod
+    def _counts_query(usernames: List[str], period: DateRange) -> Tuple[str, Dict]:
+        """Build an aliased query for the issue and MR totals of usernames."""
+        variables = {
+            'after': f"{period.since}T00:00:00Z",
+            'before': f"{period.until}T23:59:59Z"
+        }
+        declarations = ["$after: Time!", "$before: Time!"]
+        fields = []
+        for i, username in enumerate(usernames):
+            variables[f"u{i}"] = username
+            declarations.append(f"$u{i}: String!")
+            fields.append(
+                f"u{i}: user(username: $u{i}) {{"
+                " opened: authoredMergeRequests(createdAfter: $after, createdBefore: $before) { count }"
+                " merged: authoredMergeRequests(state: merged, createdAfter: $after,"
+                " createdBefore: $before) { count } }"
+                f" i{i}: issues(authorUsername: $u{i}, createdAfter: $after,"
+                " createdBefore: $before) { count }")
+        return f"query({', '.join(declarations)}) {{ {' '.join(fields)} }}", variables
+
+    def _fetch_counts(self, usernames: List[str],
+                      period: DateRange) -> Dict[str, Optional[Dict]]:
+        """
+        Get issue and MR totals for a batch of users, cached or via GraphQL.
+
+        Totals share their counts_* cache entries with the REST count mode.
+
+        Returns:
+            Dictionary mapping username to {'issues': ..., 'mrs': ...}, or to
+            None for unknown users
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        missing = []
+        for username in usernames:
+            counts = {
+                'issues': self._cached_counts(self._counts_key('issues', username, period)),
+                'mrs': self._cached_counts(self._counts_key('mrs', username, period))
+            }
+            if None in counts.values():
+                missing.append(username)
+            else:
+                results[username] = counts
+        if not missing:
+            return results
+
+        data = self._graphql(*self._counts_query(missing, period))
+        for i, username in enumerate(missing):
+            user = data.get(f"u{i}")
+            if user is None:
+                results[username] = None
+                continue
+            counts = {
+                'issues': {'all': data[f"i{i}"]['count']},
+                'mrs': {'all': user['opened']['count'], 'merged': user['merged']['count']}
             }
+            self.cache.store_value(self._counts_key('issues', username, period),
+                                   counts['issues'])
+            self.cache.store_value(self._counts_key('mrs', username, period), counts['mrs'])
+            results[username] = counts
+        return results
+
+    def _user_counts(self, username: str, period: DateRange) -> Optional[Dict]:
+        batch = self._batch_of(username)
+        results = self._once(f"graphql_counts_{period.key}_{'_'.join(batch)}",
+                             lambda: self._fetch_counts(batch, period))
+        return results[username]
+
+    def get_user_issue_stats(self, username: str, period: DateRange) -> Dict:
+        """Get issue statistics for a user over a date range."""
+        if self.details:
+            return super().get_user_issue_stats(username, period)
+        try:
+            counts = self._user_counts(username, period)
+            if counts is None:
+                return error_result(username, self.get_user_issue_stats, USER_NOT_FOUND)
+            return self._issue_stats(username, period, counts['issues'])
+        except requests.exceptions.RequestException as e:
+            logger.debug("Error getting issue stats for %s: %s", username, e)
+            return error_result(username, self.get_user_issue_stats, str(e))
+
+    def get_user_mr_stats(self, username: str, period: DateRange) -> Dict:
+        """Get MR statistics for a user over a date range."""
+        if self.details:
+            return super().get_user_mr_stats(username, period)
+        try:
+            counts = self._user_counts(username, period)
+            if counts is None:
+                return error_result(username, self.get_user_mr_stats, USER_NOT_FOUND)
+            return self._mr_stats(username, period, counts['mrs'])
+        except requests.exceptions.RequestException as e:
+            logger.debug("Error getting MR stats for %s: %s", username, e)
+            return error_result(username, self.get_user_mr_stats, str(e))
+
+
+class AsyncGitLabAPI(_GitLabClientBase):
+    """
+    asyncio variant of GitLabAPI.
+
+    Exposes the same get_user_* methods as coroutines. All requests share a
+    single aiohttp connection pool, and a semaphore caps how many are in
+    flight at once. Use it as an async context manager.
+    """
+
+    def __init__(self, base_url: str, token: str, cache_dir: str = ".cache",
+                 use_cache: bool = True, refresh: bool = False,
+                 max_in_flight: int = 100, **options):
+        super().__init__(base_url, token, cache_dir, use_cache, refresh, **options)
+        self.max_in_flight = max_in_flight
+        self.session = None
+        self._semaphore = None
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self.request_errors = (aiohttp.ClientError, asyncio.TimeoutError)
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.session = aiohttp.ClientSession(
+            headers={
+                'PRIVATE-TOKEN': self.token,
+                'Content-Type': 'application/json'
+            },
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def _get(self, url: str, params: Optional[Dict] = None):
+        """
+        GET a URL, returning the decoded JSON body, headers and links.
+
+        Paced and retried like GitLabAPI._request(); the semaphore slot is
+        given up while backing off.
+        """
+        endpoint = endpoint_name(url)
+        for attempt in range(self.max_retries + 1):
+            wait = self.rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self.metrics.record_sleep('rate_limit', wait)
+
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    try:
+                        async with self.session.get(url, params=params) as response:
+                            body = await response.read()
+                    finally:
+                        elapsed = time.perf_counter() - start
+                    self.metrics.record_request(endpoint, elapsed, response.status, len(body))
+                    self.rate_limiter.update(response.headers)
+                    if (response.status not in RETRY_STATUSES
+                            or attempt == self.max_retries):
+                        response.raise_for_status()
+                        return json.loads(body), response.headers, response.links
+                    delay = backoff_delay(attempt, response.headers)
+                    logger.debug("Retrying %s in %.1fs: HTTP %d", url, delay, response.status)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self.metrics.record_request(endpoint, elapsed, 'error')
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.debug("Retrying %s in %.1fs: %s", url, delay, e)
+            await asyncio.sleep(delay)
+            self.metrics.record_sleep('backoff', delay)
+
+    async def _get_page(self, url: str, params: Dict, page: int):
+        """Fetch a single page of a paginated endpoint."""
+        logger.debug("GET %s (page %d)", url, page)
+        return await self._get(url, {**params, 'page': page})
+
+    async def _make_request(self, endpoint: str, params: Dict = None) -> List[Dict]:
+        """Make API request with pagination, returning all results at once."""
+        all_results = [item async for items in self._iter_pages(endpoint, params)
+                       for item in items]
+        logger.debug("Retrieved %d items from %s", len(all_results), endpoint)
+        return all_results
+
+    async def _iter_pages(self, endpoint: str, params: Dict = None,
+                          first_page: int = 1) -> AsyncIterator[List[Dict]]:
+        """
+        Make API request with pagination, yielding the results page by page,
+        starting from first_page.
+
+        Mirrors GitLabAPI._iter_pages: once page 1 reports x-total-pages
+        up to max_in_flight of the remaining pages are requested ahead of
+        the caller (the semaphore does the throttling), otherwise the next
+        links are followed in turn.
+        """
+        url = self._api_url(endpoint)
+        per_page = 100
+
+        params = dict(params or {})
+        params['per_page'] = per_page
+
+        results, headers, links = await self._get_page(url, params, first_page)
+        yield results
+
+        total_pages = headers.get('x-total-pages', '')
+        if total_pages.isdigit():
+            remaining = iter(range(first_page + 1, int(total_pages) + 1))
+            window = deque(asyncio.ensure_future(self._get_page(url, params, page))
+                           for page in islice(remaining, self.max_in_flight))
+            try:
+                while window:
+                    page_results, _, _ = await window.popleft()
+                    for page in islice(remaining, 1):
+                        window.append(asyncio.ensure_future(self._get_page(url, params, page)))
+                    yield page_results
+            finally:
+                for task in window:
+                    task.cancel()
+        else:
+            page = first_page
+            while results:
+                next_link = links.get('next', {}).get('url')
+                if next_link:
+                    page += 1
+                    logger.debug("GET %s (page %d)", next_link, page)
+                    results, headers, links = await self._get(str(next_link))
+                elif headers.get('x-next-page'):
+                    page = int(headers['x-next-page'])
+                    results, headers, links = await self._get_page(url, params, page)
+                else:
+                    break
+                yield results
+
+    async def _once(self, key: str, coro_func: Callable):
+        """Await coro_func() the first time key is requested; share it after."""
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.ensure_future(coro_func())
+        return await self._tasks[key]
+
+    async def get_user_id(self, username: str) -> Optional[int]:
+        """Get user ID from username."""
+        return await self._once(f"user_{username}", lambda: self._lookup_user_id(username))
+
+    async def _lookup_user_id(self, username: str) -> Optional[int]:
+        """Resolve a username to its ID via the cache or the API."""
+        user_id = self._cached_user_id(username)
+        if user_id:
+            return user_id
+
+        try:
+            users = await self._make_request('users', {'username': username})
+            if users:
+                user_data = users[0]
+                self._store_user(username, user_data)
+                return user_data['id']
+        except self.request_errors as e:
+            logger.debug("Error fetching user %s: %s", username, e)
+
+        return None
+
+    async def _sync_collections(self, queries: List[CollectionQuery]):
+        """
+        Make sure the cache holds the results of consecutive per-year
+        queries (see GitLabAPI); the spans and deltas are fetched
+        concurrently.
+        """
+        spans, deltas = self._plan_crawl(queries)
+        fetches = [(span, self._span_params(span), False) for span in spans]
+        fetches += [([query], params, True) for query, params in deltas]
+        await asyncio.gather(*(self._fetch_into_cache(span, fetch_params, is_delta)
+                               for span, fetch_params, is_delta in fetches))
+
+    async def _fetch_into_cache(self, queries: List[CollectionQuery], fetch_params: Dict,
+                                is_delta: bool):
+        """Stream one crawl into the cache, as GitLabAPI._store_fetched() does."""
+        try:
+            start = time.perf_counter()
+            page = self._resume_page(queries, fetch_params)
+            pages = self._iter_pages(queries[0].endpoint, fetch_params, page + 1)
+            first_page = await pages.__anext__()
+            if not page:
+                self._begin_fetched(queries, is_delta)
+            page += 1
+            self._store_page(queries, fetch_params, page, first_page)
+            count = len(first_page)
+            async for items in pages:
+                page += 1
+                self._store_page(queries, fetch_params, page, items)
+                count += len(items)
+            self._finish_fetched(queries, count, is_delta, page, time.perf_counter() - start)
+        except self.request_errors as e:
+            logger.debug("Error fetching %s: %s", queries[0].description, e)
+
+    async def _fetch_total(self, endpoint: str, params: Dict) -> Optional[int]:
+        """Count the results of a query by fetching a one-item page."""
+        _, headers, _ = await self._get_page(self._api_url(endpoint),
+                                             {**params, 'per_page': 1}, 1)
+        return self._total_from_headers(headers)
+
+    async def get_user_issue_counts(self, username: str, period: DateRange) -> Dict:
+        """Get server-side issue totals for a user over a date range."""
+        cache_key = self._counts_key('issues', username, period)
+        counts = self._cached_counts(cache_key)
+        if counts is None:
+            logger.debug("GET issues_statistics for %s", username)
+            body, _, _ = await self._get(self._api_url('issues_statistics'),
+                                         self._authored_params(username, period))
+            counts = body['statistics']['counts']
+            self.cache.store_value(cache_key, counts)
+        return counts
+
+    async def get_user_merge_request_counts(self, username: str, period: DateRange) -> Dict:
+        """Get server-side MR totals for a user over a date range."""
+        cache_key = self._counts_key('mrs', username, period)
+        counts = self._cached_counts(cache_key)
+        if counts is None:
+            params = self._authored_params(username, period)
+            opened, merged = await asyncio.gather(
+                self._fetch_total('merge_requests', params),
+                self._fetch_total('merge_requests', {**params, 'state': 'merged'}))
+            counts = {'all': opened, 'merged': merged}
+            if None in counts.values():
+                await self._sync_merge_requests(username, period)
+                stats = self._mr_stats(username, period)
+                counts = {'all': stats['opened'], 'merged': stats['merged']}
+            self.cache.store_value(cache_key, counts)
+        return counts
+
+    async def _sync_issues(self, username: str, period: DateRange):
+        await self._sync_collections(self._yearly_queries(self._issues_query, username, period))
+
+    async def _sync_merge_requests(self, username: str, period: DateRange):
+        await self._sync_collections(
+            self._yearly_queries(self._merge_requests_query, username, period))
+
+    async def get_user_issues(self, username: str, period: DateRange) -> List[Dict]:
+        """Get issues created by user over a date range."""
+        await self._sync_issues(username, period)
+        return self.cache.load('issues', {'author': username}, period.bounds())
+
+    async def get_user_merge_requests(self, username: str, period: DateRange) -> List[Dict]:
+        """Get merge requests created by user over a date range."""
+        await self._sync_merge_requests(username, period)
+        return self.cache.load('mrs', {'author': username}, period.bounds())
+
+    async def get_user_events(self, user_id: int, period: DateRange,
+                              action: Optional[str] = None) -> List[Dict]:
+        """Get events for a user over a date range."""
+        await self._sync_events(user_id, period)
+        scope = {'author_id': user_id, **({'state': action} if action else {})}
+        return self.cache.load('events', scope, period.bounds())
+
+    async def _sync_events(self, user_id: int, period: DateRange):
+        """Make sure a user's events over a date range are cached (crawled once)."""
+        await self._once(f"events_{user_id}_{period.key}",
+                         lambda: self._sync_collections(
+                             self._yearly_queries(self._events_query, user_id, period)))
+
+    async def get_user_events_by_action(self, user_id: int,
+                                        period: DateRange) -> Dict[str, List[Dict]]:
+        """Get a user's events over a date range, grouped by action."""
+        return bucket_events_by_action(await self.get_user_events(user_id, period))
+
+    async def get_user_mr_stats(self, username: str, period: DateRange) -> Dict:
+        """Get MR statistics for a user over a date range."""
+        try:
+            if not self.details:
+                return self._mr_stats(username, period,
+                                      await self.get_user_merge_request_counts(username, period))
+            await self._sync_merge_requests(username, period)
+            return self._mr_stats(username, period)
+        except self.request_errors as e:
+            logger.debug("Error getting MR stats for %s: %s", username, e)
+            return error_result(username, self.get_user_mr_stats, str(e))
+
+    async def get_user_issue_stats(self, username: str, period: DateRange) -> Dict:
+        """Get issue statistics for a user over a date range."""
+        try:
+            if not self.details:
+                return self._issue_stats(username, period,
+                                         await self.get_user_issue_counts(username, period))
+            await self._sync_issues(username, period)
+            return self._issue_stats(username, period)
+        except self.request_errors as e:
+            logger.debug("Error getting issue stats for %s: %s", username, e)
+            return error_result(username, self.get_user_issue_stats, str(e))
+
+    async def get_user_commit_stats(self, username: str, period: DateRange) -> Dict:
+        """Get commit statistics for a user over a date range."""
+        try:
+            user_id = await self.get_user_id(username)
+            if not user_id:
+                return error_result(username, self.get_user_commit_stats, USER_NOT_FOUND)
+
+            await self._sync_events(user_id, period)
+            return self._commit_stats(username, user_id, period)
+        except self.request_errors as e:
+            logger.debug("Error getting commit stats for %s: %s", username, e)
+            return error_result(username, self.get_user_commit_stats, str(e))
+
+    async def get_user_comment_stats(self, username: str, period: DateRange) -> Dict:
+        """Get comment statistics for a user over a date range."""
+        try:
+            user_id = await self.get_user_id(username)
+            if not user_id:
+                return error_result(username, self.get_user_comment_stats, USER_NOT_FOUND)
+
+            await self._sync_events(user_id, period)
+            return self._comment_stats(username, user_id, period)
+        except self.request_errors as e:
+            logger.debug("Error getting comment stats for %s: %s", username, e)
+            return error_result(username, self.get_user_comment_stats, str(e))
 
 
 def format_item(item: Dict, item_type: str) -> str:
@@ -457,73 +1978,288 @@ def print_comments_summary(results: List[Dict]):
     print(f"{'Total':<20} {total_issues:>12} {total_mrs:>12} {total_issues + total_mrs:>12}")
 
 
-def fetch_user_stats(api: GitLabAPI, usernames: List[str], year: int,
-                     fetch_func: Callable, format_success: Callable[[Dict], str]) -> List[Dict]:
+def print_monthly_summary(results: List[Dict], description: str):
+    """Print the per-month breakdown of a phase, one column per user."""
+    results = [r for r in results if r['status'] == 'success']
+    if not results:
+        return
+    widths = [max(len(r['username']), 8) for r in results]
+    header = " ".join(f"{r['username']:>{width}}" for r, width in zip(results, widths))
+
+    print(f"\n{description.upper()} BY MONTH")
+    print("-"*70)
+    print(f"{'Month':<10} {header} {'Total':>8}")
+    for month in results[0]['by_month']:
+        values = [r['by_month'][month] for r in results]
+        row = " ".join(f"{value:>{width}}" for value, width in zip(values, widths))
+        print(f"{month:<10} {row} {sum(values):>8}")
+
+
+# Report phases, in output order: (description, stats method name,
+# success formatter, summary printer)
+REPORT_PHASES = [
+    ("issue counts",
+     'get_user_issue_stats',
+     lambda r: f"{r['issue_count']} issues",
+     print_issue_summary),
+    ("MR statistics",
+     'get_user_mr_stats',
+     lambda r: f"Opened: {r['opened']}, Merged: {r['merged']}",
+     print_mr_summary),
+    ("commit statistics",
+     'get_user_commit_stats',
+     lambda r: f"{r['commit_count']} commits",
+     print_commits_summary),
+    ("comment statistics",
+     'get_user_comment_stats',
+     lambda r: f"Issues: {r['issues_commented']}, MRs: {r['mrs_commented']}",
+     print_comments_summary),
+]
+
+
+def print_phase_banner(index: int, description: str, period: DateRange):
+    """Print the banner that starts a report phase."""
+    prefix = "\n" if index else ""
+    print(f"{prefix}Fetching {description} for {period.label}...\n")
+
+
+def fetch_one_user(api: GitLabAPI, username: str, period: DateRange,
+                   fetch_func: Callable) -> Dict:
     """
-    Fetch statistics for a list of users using the provided fetch function.
+    Verify that a user exists, then fetch their stats with fetch_func.
 
-    Args:
-        api: GitLabAPI instance
-        usernames: List of GitLab usernames
-        year: Year to query
-        fetch_func: Method to call for each user (signature: func(username, year) -> dict)
-        format_success: Function to format success message (signature: func(result) -> str)
+    With a run journal, the result and its wall time are recorded, and a
+    result the resumed run already has is returned as is.
+    """
+    unit = journal_unit(fetch_func, username, period)
+    if api.journal is not None and api.journal.result(unit) is not None:
+        return api.journal.result(unit)
+
+    start = time.perf_counter()
+    if not api.get_user_id(username):
+        result = error_result(username, fetch_func, USER_NOT_FOUND)
+    else:
+        result = fetch_func(username, period)
+    if api.journal is not None:
+        api.journal.record_unit(unit, result, time.perf_counter() - start)
+    return result
+
+
+async def fetch_one_user_async(api: AsyncGitLabAPI, username: str, period: DateRange,
+                               fetch_func: Callable) -> Dict:
+    """Coroutine counterpart of fetch_one_user() for AsyncGitLabAPI."""
+    unit = journal_unit(fetch_func, username, period)
+    if api.journal is not None and api.journal.result(unit) is not None:
+        return api.journal.result(unit)
+
+    start = time.perf_counter()
+    if not await api.get_user_id(username):
+        result = error_result(username, fetch_func, USER_NOT_FOUND)
+    else:
+        result = await fetch_func(username, period)
+    if api.journal is not None:
+        api.journal.record_unit(unit, result, time.perf_counter() - start)
+    return result
+
+
+def print_user_result(result: Dict, format_success: Callable[[Dict], str]):
+    """Print the progress line for a single user's result."""
+    username = result['username']
+    if result['status'] == 'success':
+        print(f"Querying {username}... ✓ {format_success(result)}")
+    elif result.get('error') == USER_NOT_FOUND:
+        print(f"Querying {username}... ✗ User not found")
+    else:
+        print(f"Querying {username}... ✗ Error: {result.get('error', 'Unknown error')}")
+
+
+def submit_user_stats(executor: ThreadPoolExecutor, api: GitLabAPI,
+                      usernames: List[str], period: DateRange,
+                      fetch_func: Callable) -> List[Future]:
+    """
+    Queue fetch_func for every user on the executor.
+
+    Returns:
+        List of futures, in the same order as usernames
+    """
+    return [executor.submit(fetch_one_user, api, username, period, fetch_func)
+            for username in usernames]
+
+
+def collect_user_stats(futures: List[Future],
+                       format_success: Callable[[Dict], str]) -> List[Dict]:
+    """
+    Wait for queued per-user fetches and print them in submission order.
 
     Returns:
         List of result dictionaries
     """
     results = []
+    for future in futures:
+        result = future.result()
+        print_user_result(result, format_success)
+        results.append(result)
+    return results
+
+
+def run_report(api: GitLabAPI, usernames: List[str], period: DateRange, jobs: int,
+               show: bool = True) -> Dict[str, List[Dict]]:
+    """
+    Fetch (and, if show, print) every report phase using a pool of worker
+    threads.
 
-    for username in usernames:
-        # Verify user exists
-        user_id = api.get_user_id(username)
-        if not user_id:
-            print(f"Querying {username}... ✗ User not found")
-            # Return error result with appropriate fields based on fetch_func
-            func_name = fetch_func.__name__
-            if 'issue_stats' in func_name:
-                results.append({
-                    'username': username,
-                    'issue_count': 0,
-                    'status': 'error',
-                    'error': 'User not found'
-                })
-            elif 'commit' in func_name:
-                results.append({
-                    'username': username,
-                    'commit_count': 0,
-                    'status': 'error',
-                    'error': 'User not found'
-                })
-            elif 'comment' in func_name:
-                results.append({
-                    'username': username,
-                    'issues_commented': 0,
-                    'mrs_commented': 0,
-                    'status': 'error',
-                    'error': 'User not found'
-                })
+    Returns:
+        Dictionary mapping each phase's stats method name to its results
+    """
+    # Every phase is queued on one worker pool up front so that later phases
+    # start fetching while earlier ones are still running; the results are
+    # then printed phase by phase, in username order.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = [submit_user_stats(executor, api, usernames, period, getattr(api, method))
+                   for _, method, _, _ in REPORT_PHASES]
+
+        report = {}
+        for index, ((description, method, format_success, print_summary), futures) in \
+                enumerate(zip(REPORT_PHASES, pending)):
+            if not show:
+                report[method] = [future.result() for future in futures]
+                continue
+            print_phase_banner(index, description, period)
+            results = collect_user_stats(futures, format_success)
+            print_summary(results)
+            if api.monthly:
+                print_monthly_summary(results, description)
+            report[method] = results
+        return report
+
+
+async def run_async_report(api: AsyncGitLabAPI, usernames: List[str], period: DateRange,
+                           show: bool = True) -> Dict[str, List[Dict]]:
+    """Fetch (and, if show, print) every report phase through AsyncGitLabAPI."""
+    async with api:
+        # As in run_report(), schedule everything before printing anything.
+        pending = [[asyncio.ensure_future(
+                        fetch_one_user_async(api, username, period, getattr(api, method)))
+                    for username in usernames]
+                   for _, method, _, _ in REPORT_PHASES]
+
+        report = {}
+        for index, ((description, method, format_success, print_summary), tasks) in \
+                enumerate(zip(REPORT_PHASES, pending)):
+            if not show:
+                report[method] = [await task for task in tasks]
+                continue
+            print_phase_banner(index, description, period)
+            results = []
+            for task in tasks:
+                result = await task
+                print_user_result(result, format_success)
+                results.append(result)
+            print_summary(results)
+            if api.monthly:
+                print_monthly_summary(results, description)
+            report[method] = results
+        return report
+
+
+# Metric columns of the machine-readable report: (column, stats method name,
+# result field)
+EXPORT_COLUMNS = [
+    ('issues', 'get_user_issue_stats', 'issue_count'),
+    ('mrs_opened', 'get_user_mr_stats', 'opened'),
+    ('mrs_merged', 'get_user_mr_stats', 'merged'),
+    ('commits', 'get_user_commit_stats', 'commit_count'),
+    ('issues_commented', 'get_user_comment_stats', 'issues_commented'),
+    ('mrs_commented', 'get_user_comment_stats', 'mrs_commented'),
+]
+
+# With --monthly, the phases whose by_month breakdown is exported, as
+# (column prefix, stats method name); each month becomes a PREFIX_YYYY-MM
+# column. Comments are counted per month across issues and MRs together.
+MONTHLY_COLUMNS = [
+    ('issues', 'get_user_issue_stats'),
+    ('mrs_opened', 'get_user_mr_stats'),
+    ('commits', 'get_user_commit_stats'),
+    ('comments', 'get_user_comment_stats'),
+]
+
+
+def report_table(report: Dict[str, List[Dict]], usernames: List[str],
+                 period: DateRange, monthly: bool = False) -> List[Dict]:
+    """
+    Flatten the results of every report phase into one wide table.
+
+    Returns:
+        One row per user, with a column per metric (None where that
+        phase failed), with monthly a column per month of each
+        MONTHLY_COLUMNS metric, and the errors, if any
+    """
+    rows = []
+    for index, username in enumerate(usernames):
+        row = {'username': username, 'since': str(period.since), 'until': str(period.until)}
+        errors = []
+        for column, method, field in EXPORT_COLUMNS:
+            result = report[method][index]
+            if result['status'] == 'success':
+                row[column] = result[field]
             else:
-                results.append({
-                    'username': username,
-                    'opened': 0,
-                    'merged': 0,
-                    'status': 'error',
-                    'error': 'User not found'
-                })
-            continue
-
-        # Fetch stats
-        print(f"Querying {username}...", end=' ')
-        result = fetch_func(username, year)
-        results.append(result)
+                row[column] = None
+                if result['error'] not in errors:
+                    errors.append(result['error'])
+        if monthly:
+            for prefix, method in MONTHLY_COLUMNS:
+                by_month = report[method][index].get('by_month', {})
+                for month in period.months():
+                    row[f"{prefix}_{month}"] = by_month.get(month)
+        row['error'] = "; ".join(errors) or None
+        rows.append(row)
+    return rows
+
+
+def write_table(rows: List[Dict], fmt: str, path: Optional[str]):
+    """
+    Write rows as JSON, CSV or Parquet to path, or to stdout if path is None
+    (not for Parquet).
+    """
+    if fmt == 'parquet':
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+        return
 
-        if result['status'] == 'success':
-            print(f"✓ {format_success(result)}")
-        else:
-            print(f"✗ Error: {result.get('error', 'Unknown error')}")
+    out = open(path, 'w', newline='') if path else sys.stdout
+    try:
+        if fmt == 'json':
+            json.dump(rows, out, indent=2)
+            out.write("\n")
+        elif rows:
+            writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if path:
+            out.close()
 
-    return results
+
+# File suffixes accepted by --export-objects, and the format they select
+EXPORT_SUFFIXES = {'.json': 'json', '.csv': 'csv', '.parquet': 'parquet'}
+
+
+def parse_cache_ttls(specs: List[str]) -> Dict[str, Tuple]:
+    """
+    Parse --cache-ttl FAMILY=SECONDS overrides for the current-year TTL.
+
+    SECONDS may be 'never' for entries that should not expire.
+    """
+    ttls = {}
+    for spec in specs:
+        family, sep, value = spec.partition('=')
+        if not sep or not (value.isdigit() or value == 'never'):
+            raise ValueError(f"invalid --cache-ttl '{spec}', expected FAMILY=SECONDS")
+        if family not in CACHE_TTLS:
+            raise ValueError(f"invalid --cache-ttl '{spec}', FAMILY must be one of "
+                             f"{', '.join(CACHE_TTLS)}")
+        past_ttl = CACHE_TTLS[family][1]
+        ttls[family] = (None if value == 'never' else int(value), past_ttl)
+    return ttls
 
 
 def main():
@@ -535,6 +2271,20 @@ Examples:
   %(prog)s user1 user2 user3
   %(prog)s --token $GITLAB_TOKEN user1
   %(prog)s --verbose --clear-cache user1
+  %(prog)s --refresh user1
+  %(prog)s --resume user1 user2 user3
+  %(prog)s --details user1
+  %(prog)s --since 2021-01-01 --until 2025-12-31 --monthly user1
+  %(prog)s --format csv --output activity.csv user1 user2
+  %(prog)s --export-objects objects.parquet user1
+  %(prog)s --max-retries 10 user1
+  %(prog)s --backend graphql --graphql-batch 20 user1 user2 user3
+  %(prog)s --cache-ttl events=600 --cache-max-mb 256 user1
+  %(prog)s --cache-stats
+  %(prog)s --metrics --metrics-file activity.prom user1
+  %(prog)s --jobs 16 user1 user2 user3
+  %(prog)s --jobs 8 --page-fanout 8 user1
+  %(prog)s --async --max-in-flight 200 user1 user2 user3
   %(prog)s --gitlab-url https://gitlab.example.com user1
         """
     )
@@ -558,16 +2308,120 @@ Examples:
     parser.add_argument('--no-cache',
                         action='store_true',
                         help='Bypass cache and fetch fresh data from API')
+    parser.add_argument('--refresh',
+                        action='store_true',
+                        help='Fetch only items changed since they were cached '
+                             'and merge them into the cache')
+    parser.add_argument('--resume',
+                        action='store_true',
+                        help='Resume an interrupted run: skip the users and phases it '
+                             'finished and continue its crawls from the page they '
+                             'stopped at')
+    parser.add_argument('--details',
+                        action='store_true',
+                        help='Crawl every issue and MR instead of asking GitLab '
+                             'for the totals')
+    parser.add_argument('--max-retries',
+                        type=int,
+                        default=5,
+                        help='Retries for rate-limited or failed requests (default: 5)')
+    parser.add_argument('--cache-ttl',
+                        action='append',
+                        default=[],
+                        metavar='FAMILY=SECONDS',
+                        help='Override how long current-year entries of a cache key '
+                             f'family ({", ".join(CACHE_TTLS)}) stay fresh; '
+                             'may be repeated')
+    parser.add_argument('--cache-max-mb',
+                        type=int,
+                        default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024),
+                        help='Evict least recently used cache entries beyond this size '
+                             '(default: %(default)s)')
+    parser.add_argument('--cache-stats',
+                        action='store_true',
+                        help='Show cache size and hit/miss statistics and exit')
+    parser.add_argument('--metrics',
+                        action='store_true',
+                        help='Print request counts, latencies, bytes, rate limit sleeps '
+                             'and cache hits to stderr at exit')
+    parser.add_argument('--metrics-file',
+                        metavar='FILE',
+                        help='Write the request metrics to FILE: JSON if it ends in '
+                             '.json, otherwise a Prometheus textfile')
     parser.add_argument('--year', '-y',
                         type=int,
-                        default=2025,
-                        help='Year to query (default: 2025)')
+                        help=f'Year to query, short for --since YEAR-01-01 --until '
+                             f'YEAR-12-31 (default: {DEFAULT_YEAR})')
+    parser.add_argument('--since',
+                        type=date.fromisoformat,
+                        metavar='YYYY-MM-DD',
+                        help='Start of the date range to query (default: January 1st '
+                             'of the --until year)')
+    parser.add_argument('--until',
+                        type=date.fromisoformat,
+                        metavar='YYYY-MM-DD',
+                        help='End of the date range to query, inclusive (default: today)')
+    parser.add_argument('--monthly',
+                        action='store_true',
+                        help='Also break each summary down by month, or with --format '
+                             'json/csv/parquet add a column per month (implies --details)')
+    parser.add_argument('--format', '-f',
+                        choices=['text', 'json', 'csv', 'parquet'],
+                        default='text',
+                        help='Output format; json, csv and parquet write one row per '
+                             'user with a column per stat (default: text)')
+    parser.add_argument('--output', '-o',
+                        help='File to write --format json/csv/parquet output to '
+                             '(default: stdout; required for parquet)')
+    parser.add_argument('--export-objects',
+                        metavar='FILE',
+                        help='Also export the fetched issues, MRs and events as a table '
+                             '(.parquet, .csv or .json); implies --details')
+    parser.add_argument('--jobs', '-j',
+                        type=int,
+                        default=4,
+                        help='Number of concurrent API workers (default: 4)')
+    parser.add_argument('--page-fanout',
+                        type=int,
+                        default=4,
+                        help='Number of result pages to prefetch concurrently '
+                             'per query (default: 4)')
+    parser.add_argument('--backend',
+                        choices=['rest', 'graphql'],
+                        default='rest',
+                        help='API used for user IDs and issue/MR totals (default: rest)')
+    parser.add_argument('--graphql-batch',
+                        type=int,
+                        default=10,
+                        help='Users per GraphQL query with --backend graphql (default: 10)')
+    parser.add_argument('--async',
+                        dest='use_async',
+                        action='store_true',
+                        help='Run the report on the asyncio client (requires aiohttp)')
+    parser.add_argument('--max-in-flight',
+                        type=int,
+                        default=100,
+                        help='Maximum concurrent requests with --async (default: 100)')
 
     args = parser.parse_args()
 
     # Set up logging based on verbosity
     setup_logging(args.verbose)
 
+    try:
+        cache_options = {
+            'cache_ttls': parse_cache_ttls(args.cache_ttl),
+            'cache_max_bytes': args.cache_max_mb * 1024 * 1024
+        }
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.cache_stats:
+        GitLabCache(args.cache_dir, ttls=cache_options['cache_ttls'],
+                    max_bytes=cache_options['cache_max_bytes']).print_stats()
+        return
+
     # Resolve token (priority: --token > GITLAB_TOKEN env > DEFAULT_TOKEN)
     token = args.token or DEFAULT_TOKEN
     if not token:
@@ -581,7 +2435,9 @@ Examples:
         if cache_path.exists():
             import shutil
             shutil.rmtree(cache_path)
-            print(f"Cleared cache directory: {cache_path}")
+            # stdout carries the report itself with --format json/csv
+            print(f"Cleared cache directory: {cache_path}",
+                  file=sys.stdout if args.format == 'text' else sys.stderr)
 
     # Use default usernames if none provided
     usernames = args.usernames if args.usernames else DEFAULT_USERNAMES
@@ -592,66 +2448,134 @@ Examples:
 
     # Configuration
     use_cache = not args.no_cache
-    year = args.year
 
-    logger.debug("Year: %d", year)
+    if args.year is not None and (args.since or args.until):
+        print("Error: --year cannot be combined with --since/--until.")
+        sys.exit(1)
+    if args.since or args.until:
+        until = args.until or date.today()
+        period = DateRange(args.since or date(until.year, 1, 1), until)
+        if period.since > period.until:
+            print("Error: --since must not be after --until.")
+            sys.exit(1)
+    else:
+        period = DateRange.for_year(args.year if args.year is not None else DEFAULT_YEAR)
+
+    if args.jobs < 1 or args.page_fanout < 1 or args.max_in_flight < 1:
+        print("Error: --jobs, --page-fanout and --max-in-flight must be at least 1.")
+        sys.exit(1)
+
+    if args.graphql_batch < 1:
+        print("Error: --graphql-batch must be at least 1.")
+        sys.exit(1)
+
+    if args.use_async and args.backend == 'graphql':
+        print("Error: --backend graphql is not supported with --async.")
+        sys.exit(1)
+
+    if args.max_retries < 0:
+        print("Error: --max-retries cannot be negative.")
+        sys.exit(1)
+
+    if args.output and args.format == 'text':
+        print("Error: --output requires --format json, csv or parquet.")
+        sys.exit(1)
+
+    if args.format == 'parquet' and not args.output:
+        print("Error: --format parquet requires --output.")
+        sys.exit(1)
+
+    export_format = None
+    if args.export_objects:
+        export_format = EXPORT_SUFFIXES.get(Path(args.export_objects).suffix)
+        if export_format is None:
+            print("Error: --export-objects must end in .parquet, .csv or .json.")
+            sys.exit(1)
+
+    if pyarrow is None and 'parquet' in (args.format, export_format):
+        print("Error: pyarrow library required for Parquet output. "
+              "Install with: pip install pyarrow")
+        sys.exit(1)
+
+    if args.use_async and aiohttp is None:
+        print("Error: aiohttp library required for --async. Install with: pip install aiohttp")
+        sys.exit(1)
+
+    logger.debug("Period: %s", period.label)
+    logger.debug("Jobs: %d", args.jobs)
+    logger.debug("Page fan-out: %d", args.page_fanout)
     logger.debug("Cache enabled: %s", use_cache)
+    logger.debug("Incremental refresh: %s", args.refresh)
+    details = args.details or args.monthly or bool(args.export_objects)
+    logger.debug("Details: %s", details)
+    logger.debug("Monthly breakdown: %s", args.monthly)
+    logger.debug("Backend: %s", args.backend)
     logger.debug("Cache directory: %s", args.cache_dir)
 
-    if not use_cache:
+    show = args.format == 'text'
+    if not use_cache and show:
         print("[Cache disabled - fetching fresh data]\n")
 
-    # Initialize API client
-    api = GitLabAPI(
-        base_url=args.gitlab_url,
-        token=token,
-        cache_dir=args.cache_dir,
-        use_cache=use_cache
-    )
-
-    # Fetch and display issue statistics
-    print(f"Fetching issue counts for {year}...\n")
-    issue_results = fetch_user_stats(
-        api,
-        usernames,
-        year,
-        api.get_user_issue_stats,
-        lambda r: f"{r['issue_count']} issues"
-    )
-    print_issue_summary(issue_results)
-
-    # Fetch and display MR statistics
-    print(f"\nFetching MR statistics for {year}...\n")
-    mr_results = fetch_user_stats(
-        api,
-        usernames,
-        year,
-        api.get_user_mr_stats,
-        lambda r: f"Opened: {r['opened']}, Merged: {r['merged']}"
-    )
-    print_mr_summary(mr_results)
-
-    # Fetch and display commit statistics
-    print(f"\nFetching commit statistics for {year}...\n")
-    commit_results = fetch_user_stats(
-        api,
-        usernames,
-        year,
-        api.get_user_commit_stats,
-        lambda r: f"{r['commit_count']} commits"
-    )
-    print_commits_summary(commit_results)
-
-    # Fetch and display comment statistics
-    print(f"\nFetching comment statistics for {year}...\n")
-    comment_results = fetch_user_stats(
-        api,
-        usernames,
-        year,
-        api.get_user_comment_stats,
-        lambda r: f"Issues: {r['issues_commented']}, MRs: {r['mrs_commented']}"
-    )
-    print_comments_summary(comment_results)
+    journal = RunJournal(args.cache_dir, {
+        'gitlab_url': args.gitlab_url,
+        'usernames': usernames,
+        'period': period.key,
+        'details': details,
+        'monthly': args.monthly,
+        'backend': args.backend
+    }, resume=args.resume)
+
+    api_kwargs = {
+        'base_url': args.gitlab_url,
+        'token': token,
+        'cache_dir': args.cache_dir,
+        'use_cache': use_cache,
+        'refresh': args.refresh,
+        'details': details,
+        'monthly': args.monthly,
+        'max_retries': args.max_retries,
+        'journal': journal,
+        **cache_options
+    }
+
+    if args.use_async:
+        api = AsyncGitLabAPI(**api_kwargs, max_in_flight=args.max_in_flight)
+        report = asyncio.run(run_async_report(api, usernames, period, show))
+    elif args.backend == 'graphql':
+        api = GitLabGraphQLAPI(
+            **api_kwargs,
+            pool_size=max(10, args.jobs + args.page_fanout),
+            page_fanout=args.page_fanout,
+            batch_size=args.graphql_batch
+        )
+        api.plan_batches(usernames)
+        report = run_report(api, usernames, period, args.jobs, show)
+    else:
+        api = GitLabAPI(
+            **api_kwargs,
+            pool_size=max(10, args.jobs + args.page_fanout),
+            page_fanout=args.page_fanout
+        )
+        report = run_report(api, usernames, period, args.jobs, show)
+
+    if not show:
+        write_table(report_table(report, usernames, period, args.monthly), args.format,
+                    args.output)
+
+    if args.export_objects:
+        rows = api.export_objects(usernames, period)
+        write_table(rows, export_format, args.export_objects)
+        logger.debug("Exported %d objects to %s", len(rows), args.export_objects)
+
+    journal.log_slowest()
+    journal.close()
+    for outcome, count in api.cache.counters.items():
+        api.metrics.record_cache(outcome, count)
+    if args.metrics:
+        api.metrics.print_summary()
+    if args.metrics_file:
+        api.metrics.write(args.metrics_file)
+    api.cache.close()
 
 
 if __name__ == '__main__':
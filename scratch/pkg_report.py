@@ -10,14 +10,22 @@ $ ./pkg_report.py --release rhcos-4.7 --package shim-x64
 47.82.202010110827-0 = shim-x64-15-15.el8_2.x86_64 on 2020-10-11 08:27:00
 47.82.202011041142-0 = shim-x64-15-16.el8.x86_64 on 2020-11-04 11:42:00
 
-TODO: store data in sqlite database to speed up execution
+The package lists of every build seen are kept in a local SQLite index
+(see --db), so only builds that are new since the last run are downloaded,
+and with --no-update a query doesn't touch the network at all.
 '''
 
 import argparse
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import fnmatch
+from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+import sqlite3
 import sys
+import time
 
 BASEURL = 'https://rhcos-redirector.ci.openshift.org/art/storage/releases/'
 RELEASES = ['rhcos-4.3',
@@ -37,16 +45,40 @@ RELEASES = ['rhcos-4.3',
             'rhcos-4.8-ppc64le',
             'rhcos-4.8-s390x']
 
+DEFAULT_DB = Path(__file__).parent / '.pkg_report.sqlite3'
+DEFAULT_JOBS = 8
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS releases (
+        name TEXT PRIMARY KEY,
+        arch TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS builds (
+        release TEXT NOT NULL REFERENCES releases (name),
+        build TEXT NOT NULL,
+        PRIMARY KEY (release, build)
+    );
+    CREATE TABLE IF NOT EXISTS packages (
+        release TEXT NOT NULL,
+        build TEXT NOT NULL,
+        name TEXT NOT NULL,
+        nvr TEXT NOT NULL,
+        PRIMARY KEY (release, build, name),
+        FOREIGN KEY (release, build) REFERENCES builds (release, build)
+    );
+    CREATE INDEX IF NOT EXISTS packages_by_name
+        ON packages (name, release, build);
+'''
+
 
-def get_builds(release):
+def get_builds(release, session=None):
     '''
     Given a release version string, return a sorted list of build numbers
     '''
     build_list = []
     builds_url = BASEURL + release + '/builds.json'
-    builds_req = requests.get(builds_url)
+    builds_req = (session or requests).get(builds_url)
     if builds_req.status_code != 200:
-        raise Exception('Failed to retrieve list of builds')
+        raise Exception(f'Failed to retrieve list of builds for {release}')
     for bld in builds_req.json()['builds']:
         build_list.append(bld['id'])
 
@@ -54,87 +86,428 @@ def get_builds(release):
     return build_list
 
 
-def map_rpm_to_versions(package=None, release=None):
+def match_releases(patterns):
     '''
-    Given a package/RPM name and a OCP release version string, produce
-    an OrderedDict of "version = {previous_version, nvr}" entries
+    Given a list of release names or glob patterns ('all' matches every
+    release), return the matching entries of RELEASES in their usual order
     '''
-    if package is None:
-        raise Exception('Must provide package name')
-    if release is None:
-        raise Exception('Must provide release')
+    patterns = ['*' if pattern == 'all' else pattern for pattern in patterns]
+    return [release for release in RELEASES
+            if any(fnmatch.fnmatchcase(release, pattern) for pattern in patterns)]
+
 
+def release_arch(release):
+    '''
+    Given a release version string, return the architecture its builds are
+    for, e.g. 'ppc64le' for 'rhcos-4.7-ppc64le'
+    '''
     arch = 'x86_64'
     split_release = release.split('-')
     if len(split_release) > 2:
         arch = split_release[2]
+    return arch
 
-    try:
-        release_builds = get_builds(release)
-    except Exception as err:
-        raise err
-
-    # we want to preserve the order of the builds, so use an OrderedDict
-    build_package_map = OrderedDict()
-    # we need the length of the sorted list of builds, so we can easily
-    # index the current build and previous build
-    release_builds_len = len(release_builds)
-    for bld in range(release_builds_len):
-        current_ver = release_builds[bld]
-
-        if bld == 0:
-            previous_ver = None
-        else:
-            previous_ver = release_builds[bld - 1]
 
-        current_cm_url = (f'{BASEURL}/{release}/{current_ver}/'
-                          f'{arch}/commitmeta.json')
-        current_cm_req = requests.get(current_cm_url)
-        if current_cm_req.status_code != 200:
-            raise Exception('Failed to retrieve commitmeta for '
-                            f'{current_ver}: status code = '
-                            f'{current_cm_req.status_code}')
+def make_session(pool_size=DEFAULT_JOBS):
+    '''
+    Return a requests session whose connection pool can keep pool_size
+    connections to the redirector open
+    '''
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_pkglist(release, build, arch, session=None):
+    '''
+    Given a release, build and architecture, return the build's RPM list as
+    (name, nvr) tuples, from its commitmeta.json
+    '''
+    cm_url = f'{BASEURL}/{release}/{build}/{arch}/commitmeta.json'
+    cm_req = (session or requests).get(cm_url)
+    if cm_req.status_code != 200:
+        raise Exception(f'Failed to retrieve commitmeta for {build}: '
+                        f'status code = {cm_req.status_code}')
+
+    rpmdb = cm_req.json()['rpmostree.rpmdb.pkglist']
+    return [(rpm[0], f'{rpm[0]}-{rpm[2]}-{rpm[3]}.{rpm[4]}') for rpm in rpmdb]
+
+
+def open_index(path=DEFAULT_DB):
+    '''
+    Open (creating it if needed) the SQLite index of releases, builds and
+    the package NVRs in each build
+    '''
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def print_progress(done, total, started, final=False):
+    '''
+    Overwrite the progress line on stderr with the builds fetched so far
+    and the fetch rate
+    '''
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f'Fetched {done}/{total} builds ({rate:.1f} builds/s)',
+          end='\n' if final else '\r', file=sys.stderr, flush=True)
+
+
+def index_build(db, releases, build, arch, pkglist):
+    '''
+    Record a build and its package list under each of the given releases
+    '''
+    # one transaction per build, so an interrupted update keeps the builds
+    # indexed so far
+    with db:
+        for release in releases:
+            db.execute('INSERT OR IGNORE INTO releases VALUES (?, ?)',
+                       (release, arch))
+            db.execute('INSERT INTO builds VALUES (?, ?)', (release, build))
+            # a name can be listed more than once (e.g. gpg-pubkey); keep
+            # the first entry, as a linear scan of the pkglist would
+            db.executemany('INSERT OR IGNORE INTO packages VALUES (?, ?, ?, ?)',
+                           [(release, build, name, nvr) for name, nvr in pkglist])
+
+
+def indexed_pkglist(db, build, arch):
+    '''
+    Return the package list of a build already indexed for another release
+    of the same architecture, or None
+    '''
+    source = db.execute('SELECT b.release FROM builds b '
+                        'JOIN releases r ON r.name = b.release '
+                        'WHERE b.build = ? AND r.arch = ? LIMIT 1',
+                        (build, arch)).fetchone()
+    if source is None:
+        return None
+    return db.execute('SELECT name, nvr FROM packages WHERE release = ? AND build = ?',
+                      (source[0], build)).fetchall()
+
+
+def update_index(db, releases, jobs=DEFAULT_JOBS, skip_failed=False):
+    '''
+    Given an index and a list of release version strings, add the builds of
+    the releases that aren't indexed yet, and return how many were added
+
+    The releases' build lists are fetched in parallel. A build that several
+    releases share (same build and architecture) is only fetched once, and
+    one already indexed for another release is copied from the index. The
+    commitmeta.json of up to jobs builds are fetched at once over a pooled
+    session; they are indexed in sorted build order as they arrive. With
+    skip_failed, a release whose build list can't be fetched is skipped
+    with a warning rather than failing the update.
+    '''
+    session = make_session(jobs)
+
+    def fetch_builds(release):
+        try:
+            return get_builds(release, session)
+        except Exception as err:
+            if not skip_failed:
+                raise
+            print(f'Skipping {release}: {err}', file=sys.stderr)
+            return []
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        release_builds = list(executor.map(fetch_builds, releases))
+
+    # (build, arch) -> the releases it still has to be indexed for
+    wanted = OrderedDict()
+    for release, builds in zip(releases, release_builds):
+        arch = release_arch(release)
+        indexed = {build for (build,) in db.execute(
+            'SELECT build FROM builds WHERE release = ?', (release,))}
+        for build in builds:
+            if build not in indexed:
+                wanted.setdefault((build, arch), []).append(release)
+
+    added = 0
+    to_fetch = []
+    for (build, arch), build_releases in wanted.items():
+        pkglist = indexed_pkglist(db, build, arch)
+        if pkglist is None:
+            to_fetch.append((build, arch, build_releases))
+            continue
+        index_build(db, build_releases, build, arch, pkglist)
+        added += len(build_releases)
+    if not to_fetch:
+        return added
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # map() hands results back in submission (sorted) order
+        pkglists = executor.map(
+            lambda entry: get_pkglist(entry[2][0], entry[0], entry[1], session),
+            to_fetch)
+        for done, ((build, arch, build_releases), pkglist) in \
+                enumerate(zip(to_fetch, pkglists), 1):
+            index_build(db, build_releases, build, arch, pkglist)
+            added += len(build_releases)
+            print_progress(done, len(to_fetch), started, final=done == len(to_fetch))
+
+    return added
 
-        rpmdb = current_cm_req.json()['rpmostree.rpmdb.pkglist']
-        for rpm in rpmdb:
-            nvr = f'{rpm[0]}-{rpm[2]}-{rpm[3]}.{rpm[4]}'
-            if rpm[0] == package:
-                build_package_map[current_ver] = (previous_ver, nvr)
-                break
 
-    return build_package_map
+def map_rpms_to_versions(packages=None, release=None, db=None, update=True,
+                         jobs=DEFAULT_JOBS):
+    '''
+    Given a list of package/RPM names (None for every package) and a OCP
+    release version string, produce a dict mapping each package found to
+    an OrderedDict of "version = {previous_version, nvr}" entries
+
+    Every requested package is mapped in one pass over the release's
+    builds. The builds are looked up in the index db (the default index if
+    None), which is first brought up to date with the release, fetching up
+    to jobs builds at once, unless update is False.
+    '''
+    if packages is not None and not packages:
+        raise Exception('Must provide package name')
+    if release is None:
+        raise Exception('Must provide release')
+
+    if db is None:
+        db = open_index()
+    if update:
+        update_index(db, [release], jobs)
+
+    name_filter = ''
+    params = [release]
+    if packages is not None:
+        name_filter = f' AND p.name IN ({", ".join("?" * len(packages))})'
+        params = list(packages) + params
+
+    # we want to preserve the order of the builds, so use OrderedDicts
+    package_maps = {}
+    # every build of the release is walked, in order, so that each entry
+    # records the build before it even if that build lacks the package
+    previous_ver = current_ver = None
+    rows = db.execute('SELECT b.build, p.name, p.nvr FROM builds b '
+                      'LEFT JOIN packages p ON p.release = b.release '
+                      f'AND p.build = b.build{name_filter} '
+                      'WHERE b.release = ? ORDER BY b.build',
+                      params)
+    for build, name, nvr in rows:
+        if build != current_ver:
+            previous_ver, current_ver = current_ver, build
+        if name is not None:
+            package_maps.setdefault(name, OrderedDict())[build] = (previous_ver, nvr)
+
+    return package_maps
+
+
+def bisect_rpms_to_versions(packages, release, db=None, jobs=DEFAULT_JOBS):
+    '''
+    Given a list of package/RPM names and a OCP release version string,
+    produce the same dict as map_rpms_to_versions(), but only with entries
+    for the builds that had to be probed to find every NVR change
+
+    Instead of reading every build, the first and last builds are probed,
+    and any range whose endpoints disagree on the packages' NVRs is split
+    at its midpoint until each change is pinned to a pair of adjacent
+    builds, so O(changes x log builds) builds are read. The midpoints of a
+    round are fetched up to jobs at once. Probed builds come from the index
+    db when they're in it; fetched ones are not added to it, since the
+    index only holds releases whose every build has been read. This
+    assumes an NVR doesn't change and then change back between two probes;
+    such a round trip (e.g. a package missing from a single build) is
+    missed.
+    '''
+    if not packages:
+        raise Exception('Must provide package name')
+    if db is None:
+        db = open_index()
+
+    session = make_session(jobs)
+    arch = release_arch(release)
+    builds = get_builds(release, session)
+
+    # build -> the requested packages' NVRs, as a tuple (None if missing)
+    states = {}
+
+    def record(build, pkglist):
+        nvrs = {}
+        for name, nvr in pkglist:
+            nvrs.setdefault(name, nvr)
+        states[build] = tuple(nvrs.get(package) for package in packages)
+
+    def probe(probe_builds):
+        to_fetch = []
+        for build in probe_builds:
+            pkglist = indexed_pkglist(db, build, arch)
+            if pkglist is None:
+                to_fetch.append(build)
+            else:
+                record(build, pkglist)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            pkglists = executor.map(
+                lambda build: get_pkglist(release, build, arch, session), to_fetch)
+            for build, pkglist in zip(to_fetch, pkglists):
+                record(build, pkglist)
+
+    if builds:
+        probe(sorted({builds[0], builds[-1]}))
+    # (lo, hi) index ranges whose endpoints differ, split one round at a time
+    ranges = [(0, len(builds) - 1)]
+    while ranges:
+        ranges = [(lo, hi) for lo, hi in ranges
+                  if hi - lo > 1 and states[builds[lo]] != states[builds[hi]]]
+        mids = [(lo + hi) // 2 for lo, hi in ranges]
+        probe([builds[mid] for mid in mids])
+        ranges = [half for (lo, hi), mid in zip(ranges, mids)
+                  for half in ((lo, mid), (mid, hi))]
+    print(f'Probed {len(states)}/{len(builds)} builds of {release}',
+          file=sys.stderr)
+
+    package_maps = {}
+    previous_ver = None
+    for build in builds:
+        if build not in states:
+            continue
+        for package, nvr in zip(packages, states[build]):
+            if nvr is not None:
+                package_maps.setdefault(package, OrderedDict())[build] = (previous_ver, nvr)
+        previous_ver = build
+
+    return package_maps
+
+
+def bisect_releases(packages, releases, db, jobs=DEFAULT_JOBS):
+    '''
+    Run bisect_rpms_to_versions() over each of a list of releases and return
+    a dict mapping each release to its result. When there are several
+    releases, one that can't be bisected is skipped with a warning, as
+    update_index() does.
+    '''
+    release_maps = {}
+    for release in releases:
+        try:
+            release_maps[release] = bisect_rpms_to_versions(packages, release, db, jobs)
+        except Exception as err:
+            if len(releases) == 1:
+                raise
+            print(f'Skipping {release}: {err}', file=sys.stderr)
+    return release_maps
+
+
+def map_rpm_to_versions(package=None, release=None, db=None, update=True,
+                        jobs=DEFAULT_JOBS):
+    '''
+    Given a package/RPM name and a OCP release version string, produce
+    an OrderedDict of "version = {previous_version, nvr}" entries
+    (see map_rpms_to_versions())
+    '''
+    if package is None:
+        raise Exception('Must provide package name')
+    package_maps = map_rpms_to_versions([package], release, db, update, jobs)
+    return package_maps.get(package, OrderedDict())
+
+
+def package_changes(build_package_map):
+    '''
+    Given an OrderedDict from map_rpm_to_versions(), yield (version, nvr)
+    for each build where the package's NVR differs from the build before
+    '''
+    for ver, (prev_ver, rpm) in build_package_map.items():
+        previous = build_package_map.get(prev_ver)
+        if previous is not None and previous[1] == rpm:
+            continue
+        yield ver, rpm
+
+
+def build_date(ver):
+    '''
+    Given a build version string, e.g. 47.82.202010110827-0, return the
+    datetime it encodes
+    '''
+    ver_s = ver.split('.')
+    date = ver_s[2].split('-')[0]
+    return datetime.datetime.strptime(date, '%Y%m%d%H%M')
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--release', action='store', help='Release to search',
-                        choices=RELEASES)
-    parser.add_argument('--package', action='store', help='Package to query')
+    releases = parser.add_mutually_exclusive_group(required=True)
+    releases.add_argument('--release', action='store', help='Release to search',
+                          choices=RELEASES)
+    releases.add_argument('--releases', action='extend', nargs='+',
+                          metavar='PATTERN',
+                          help="Releases to search and merge into one timeline: "
+                               "'all', or names or glob patterns such as "
+                               "'rhcos-4.7*'")
+    packages = parser.add_mutually_exclusive_group(required=True)
+    packages.add_argument('--package', action='extend', nargs='+',
+                          help='Package(s) to query')
+    packages.add_argument('--all-packages', action='store_true',
+                          help='Report changes to every package')
+    parser.add_argument('--db', action='store', default=DEFAULT_DB,
+                        help=f'SQLite index of builds (default: {DEFAULT_DB})')
+    parser.add_argument('--no-update', action='store_true',
+                        help="Only query the index; don't look for new builds")
+    parser.add_argument('--jobs', '-j', action='store', type=int,
+                        default=DEFAULT_JOBS,
+                        help='Builds to fetch at once when updating the index '
+                             f'(default: {DEFAULT_JOBS})')
+    parser.add_argument('--bisect', action='store_true',
+                        help='Find the changes by bisecting each release, '
+                             'only reading the builds around them')
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if args.bisect and not args.package:
+        parser.error('--bisect needs --package')
+    if args.bisect and args.no_update:
+        parser.error('--bisect and --no-update are mutually exclusive')
+    if args.releases:
+        release_list = match_releases(args.releases)
+        if not release_list:
+            parser.error(f'no release matches {" ".join(args.releases)}')
+    else:
+        release_list = [args.release]
 
     try:
-        build_package_map = map_rpm_to_versions(package=args.package,
-                                                release=args.release)
+        db = open_index(args.db)
+        if args.bisect:
+            release_maps = bisect_releases(args.package, release_list, db, args.jobs)
+        elif not args.no_update:
+            update_index(db, release_list, args.jobs,
+                         skip_failed=len(release_list) > 1)
+        if not args.bisect:
+            release_maps = {release: map_rpms_to_versions(packages=args.package,
+                                                          release=release, db=db,
+                                                          update=False)
+                            for release in release_list}
     except Exception as err:
         print('Received an Exception while doing the RPM to version'
               f'mapping: {err}')
         sys.exit(1)
 
-    # once we have mapping, we want to print a line each time the NVR of the
-    # package changed.
-    if build_package_map:
-        for ver in build_package_map.keys():
-            prev_ver, rpm = build_package_map[ver]
-            if prev_ver is not None:
-                pv, pr = build_package_map[prev_ver]
-                if rpm == pr:
-                    continue
-            ver_s = ver.split('.')
-            date = ver_s[2].split('-')[0]
-            date_time_obj = datetime.datetime.strptime(date, '%Y%m%d%H%M')
-            print(f'{ver} = {rpm} on {date_time_obj}')
-    else:
-        print(f'Unable to find {args.package} in any builds')
+    # once we have mapping, we want to print a line each time the NVR of a
+    # package changed, as one timeline across all the packages (and
+    # releases), in build date order. A change in a build that several
+    # releases share is printed once, naming all of them.
+    change_releases = OrderedDict()
+    for release, package_maps in release_maps.items():
+        for build_package_map in package_maps.values():
+            for change in package_changes(build_package_map):
+                change_releases.setdefault(change, []).append(release)
+    changes = sorted(change_releases, key=lambda change: (build_date(change[0]), change))
+    for ver, rpm in changes:
+        if args.releases:
+            print(f'{ver} = {rpm} on {build_date(ver)} '
+                  f'({", ".join(change_releases[(ver, rpm)])})')
+        else:
+            print(f'{ver} = {rpm} on {build_date(ver)}')
+
+    found = {package for package_maps in release_maps.values()
+             for package in package_maps}
+    missing = [package for package in args.package or [] if package not in found]
+    for package in missing:
+        print(f'Unable to find {package} in any builds')
+    if missing or not found:
         sys.exit(1)
 
 